@@ -1,21 +1,152 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, session, \
+    stream_with_context
+import click
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, or_, event, func, inspect, text, bindparam
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, joinedload, load_only
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, date, timedelta
 import json
 import os
+import base64
+import hashlib
+import html
+import secrets
 import re
+import sqlite3
+import time
+import atexit
+import bisect
+import contextvars
+import threading
 import jwt
+import math
+from collections import OrderedDict
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-123-change-this-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///news_blog.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///news_blog.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = 'jwt-secret-key-123-change-this-too'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
 app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+# Stateless режим: access токен содержит id, имя и email, и token_required не обращается к БД
+app.config['JWT_STATELESS'] = False
+# Для stateless режима: если > 0, существование пользователя подтверждается запросом к БД
+# не чаще одного раза за указанное число секунд (результат хранится в кэше)
+app.config['JWT_USER_CHECK_TTL'] = 0
+app.config['JWT_USER_CACHE_MAX_ENTRIES'] = 10000
+# Удаление истёкших и отозванных refresh токенов: размер пачки и периодичность запуска
+app.config['REFRESH_TOKEN_PURGE_BATCH_SIZE'] = 1000
+app.config['REFRESH_TOKEN_PURGE_INTERVAL'] = timedelta(hours=1)
+# Хэширование паролей: метод werkzeug с параметрами стоимости ('pbkdf2:sha256:600000', 'scrypt:32768:8:1')
+app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:600000'
+# Число потоков для хэширования (0 - считать прямо в потоке запроса)
+app.config['PASSWORD_HASH_WORKERS'] = 2
+# Сколько операций хэширования может выполняться и ждать одновременно; остальные логины получают 503
+app.config['PASSWORD_HASH_MAX_PENDING'] = 16
+# Кэш отрендеренных страниц списков статей (только для гостей)
+app.config['PAGE_CACHE_ENABLED'] = True
+app.config['PAGE_CACHE_MAX_ENTRIES'] = 256
+# Полнотекстовый поиск (SQLite FTS5); выключается автоматически, если FTS5 недоступен
+app.config['SEARCH_ENABLED'] = True
+app.config['SEARCH_MAX_LIMIT'] = 100
+# Режим обновления JSON файлов: 'incremental' - точечные изменения по id, 'full' - полная перезапись
+app.config['JSON_SNAPSHOT_MODE'] = 'incremental'
+# Через сколько точечных обновлений делать полную пересборку файлов (восстановление после рассинхронизации)
+app.config['JSON_SNAPSHOT_FULL_REBUILD_EVERY'] = 500
+# Выгрузка JSON файлов в фоновом потоке; изменения за окно DEBOUNCE объединяются в одну запись
+app.config['JSON_SNAPSHOT_ASYNC'] = True
+app.config['JSON_SNAPSHOT_DEBOUNCE_SECONDS'] = 0.5
+# Максимальный размер страницы для ?limit= в списочных API
+app.config['API_PAGE_MAX_LIMIT'] = 1000
+# Лента последних статей в памяти процесса: сколько новейших статей держать всего и в каждой категории.
+# Из неё отдаются главная страница и первая страница списочных API (?limit= без cursor)
+app.config['LATEST_FEED_ENABLED'] = True
+app.config['LATEST_FEED_SIZE'] = 50
+# Комментариев на странице статьи (остальные подгружаются кнопкой "Показать ещё")
+app.config['COMMENTS_PAGE_SIZE'] = 20
+# Потоковая выдача списков (?stream=1): сколько строк читать из БД за один раз
+app.config['API_STREAM_BATCH_SIZE'] = 500
+# Максимальное число элементов в одном запросе к /api/articles/bulk и /api/comment/bulk
+app.config['API_BULK_MAX_ITEMS'] = 1000
+# Поле text в ответах API дублирует content; ?text_alias=0 убирает его из конкретного запроса
+app.config['API_ARTICLE_TEXT_ALIAS'] = True
+# Метрики запросов для /api/debug/metrics (формат Prometheus)
+app.config['METRICS_ENABLED'] = True
+# Границы корзин гистограмм: время ответа и записи JSON файлов (секунды), размер ответа (байты)
+app.config['METRICS_LATENCY_BUCKETS'] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+app.config['METRICS_SIZE_BUCKETS'] = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Профиль SQLite: 'production' - PRAGMA из SQLITE_PRAGMAS на каждом соединении и явные настройки пула,
+# 'default' - настройки SQLite и SQLAlchemy по умолчанию (rollback journal, synchronous=FULL)
+app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'production')
+app.config['SQLITE_PRAGMAS'] = {
+    # Читатели не ждут писателя, запись - одно последовательное дописывание в -wal файл
+    'journal_mode': 'WAL',
+    # В режиме WAL база остаётся целостной; при сбое питания теряются лишь последние транзакции
+    'synchronous': 'NORMAL',
+    # Сколько миллисекунд ждать освобождения блокировки записи, прежде чем вернуть "database is locked"
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер кэша страниц в KiB (64 MiB на соединение)
+    'cache_size': -64 * 1024,
+}
+app.config['SQLITE_POOL_OPTIONS'] = {
+    # Соединение держит поток запроса; пул покрывает потоки сервера и фоновые потоки
+    'pool_size': 10,
+    'max_overflow': 10,
+    'pool_timeout': 10,
+}
+# Согласование кэшей между процессами (несколько воркеров) через таблицу cache_generation:
+# не чаще раза в CACHE_SYNC_INTERVAL секунд поколения сверяются с базой перед запросом
+app.config['CACHE_SYNC_ENABLED'] = True
+app.config['CACHE_SYNC_INTERVAL'] = 0.5
+# Ограничение частоты дорогих запросов (token bucket) по IP клиента и, если передан JWT, по пользователю.
+# Ограничиваются только запросы, меняющие состояние (не GET/HEAD/OPTIONS); при исчерпании - 429 с Retry-After
+app.config['RATE_LIMIT_ENABLED'] = True
+# Хранилище корзин: 'memory' - в памяти процесса, 'sqlite' - таблица rate_limit_bucket в той же базе,
+# общая для всех воркеров
+app.config['RATE_LIMIT_BACKEND'] = 'memory'
+# Бюджеты по эндпоинтам: (ёмкость корзины, пополнение в жетонах за секунду)
+app.config['RATE_LIMITS'] = {
+    'api_login': (10, 0.2),
+    'login': (10, 0.2),
+    'register': (5, 0.05),
+    'news_detail': (20, 0.5),
+    'api_create_comment': (30, 1.0),
+}
+# Сколько корзин держать в памяти (вытесняются давно не использованные - они всё равно полные)
+app.config['RATE_LIMIT_MAX_KEYS'] = 100000
+# Строки rate_limit_bucket, не обновлявшиеся дольше этого времени (секунды), удаляются
+app.config['RATE_LIMIT_IDLE_SECONDS'] = 3600
+# Потоков для синхронных маршрутов Flask при запуске через asgi.py
+app.config['ASGI_SYNC_WORKERS'] = 10
+
+# Настройки пула задаются до создания движка; базе в памяти Flask-SQLAlchemy назначает свой пул
+if (app.config['SQLITE_PROFILE'] == 'production'
+        and app.config['SQLALCHEMY_DATABASE_URI'] not in ('sqlite://', 'sqlite:///:memory:')):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(app.config['SQLITE_POOL_OPTIONS'])
+
+@event.listens_for(Engine, 'connect')
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """PRAGMA профиля production для каждого нового соединения SQLite"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        set_sqlite_pragmas(dbapi_connection)
+
+def set_sqlite_pragmas(dbapi_connection):
+    """Выполнить SQLITE_PRAGMAS на DB-API соединении (sqlite3 или адаптер aiosqlite из asgi.py)"""
+    if app.config['SQLITE_PROFILE'] != 'production':
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
 
 db = SQLAlchemy(app)
 login_manager = LoginManager(app)
@@ -23,8 +154,8 @@ login_manager.login_view = 'login'
 login_manager.login_message = 'Пожалуйста, войдите в систему для доступа к этой странице.'
 
 # Имена JSON файлов
-ARTICLES_JSON = 'articles.json'
-COMMENTS_JSON = 'comments.json'
+ARTICLES_JSON = os.environ.get('ARTICLES_JSON', 'articles.json')
+COMMENTS_JSON = os.environ.get('COMMENTS_JSON', 'comments.json')
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -37,21 +168,54 @@ class User(UserMixin, db.Model):
 
 class RefreshToken(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    token = db.Column(db.String(500), unique=True, nullable=False)
+    # SHA-256 от токена (hex): сам токен в базе не хранится, индекс фиксированной длины
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, nullable=False)
     revoked = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        # purge_refresh_tokens: WHERE expires_at < ? OR revoked = 1
+        db.Index('ix_refresh_token_expires_at', 'expires_at'),
+        db.Index('ix_refresh_token_revoked', 'revoked'),
+        db.Index('ix_refresh_token_user_id', 'user_id'),
+    )
+
+# Категории статей, у которых есть свои страницы и списки в API
+VALID_CATEGORIES = ['technology', 'science', 'culture', 'sports', 'general']
+
+# Превью статьи для карточек списков: первые EXCERPT_LENGTH символов текста и ещё один символ,
+# по которому шаблоны понимают, что текст длиннее превью и нужно многоточие
+EXCERPT_LENGTH = 200
+
+def make_excerpt(text):
+    """Превью для колонки excerpt; вызывается везде, где меняется текст статьи"""
+    return str(text)[:EXCERPT_LENGTH + 1] if text else ''
+
+def default_excerpt(context):
+    # Значение по умолчанию при INSERT (в том числе массовом) - из текста той же строки
+    return make_excerpt(context.get_current_parameters().get('text'))
+
 class Article(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     text = db.Column(db.Text, nullable=False)
+    excerpt = db.Column(db.String(EXCERPT_LENGTH + 1), nullable=False, default=default_excerpt, server_default='')
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category = db.Column(db.String(50), default='general')
+    # Денормализованный счётчик, обновляется в одной транзакции с добавлением/удалением комментария
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     comments = db.relationship('Comment', backref='article', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Списки статей: ORDER BY created_date DESC, id DESC
+        db.Index('ix_article_created_date', 'created_date', 'id'),
+        # Статьи категории: WHERE category = ? ORDER BY created_date DESC, id DESC
+        db.Index('ix_article_category_created_date', 'category', 'created_date', 'id'),
+    )
+
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
@@ -59,6 +223,468 @@ class Comment(db.Model):
     article_id = db.Column(db.Integer, db.ForeignKey('article.id'), nullable=False)
     author_name = db.Column(db.String(100), nullable=False)
 
+    __table_args__ = (
+        # Список комментариев: ORDER BY date DESC, id DESC
+        db.Index('ix_comment_date', 'date', 'id'),
+        # Комментарии статьи: WHERE article_id = ? ORDER BY date DESC, id DESC
+        db.Index('ix_comment_article_id_date', 'article_id', 'date', 'id'),
+    )
+
+# Таблицы, запись в которые увеличивает их поколение в cache_generation
+CACHE_GENERATION_TABLES = ('article', 'comment', 'user')
+
+class CacheGeneration(db.Model):
+    """Поколение данных таблицы, общее для всех процессов приложения (см. CacheSync)"""
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    # Время последней записи (Unix, секунды) для Last-Modified: растёт минимум на секунду за запись,
+    # иначе клиент с If-Modified-Since из той же секунды получил бы 304
+    modified_at = db.Column(db.Integer, nullable=False, default=0)
+
+class RateLimitBucket(db.Model):
+    """Корзина ограничения частоты запросов для RATE_LIMIT_BACKEND = 'sqlite'"""
+    key = db.Column(db.String(200), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    # Время последнего обращения (time.time(), общее для всех процессов)
+    updated_at = db.Column(db.Float, nullable=False, index=True)
+    # Было ли разрешено последнее обращение
+    allowed = db.Column(db.Boolean, nullable=False, default=True)
+
+class LRUCache:
+    """Потокобезопасный кэш с ограничением размера (вытеснение LRU) и необязательным временем жизни"""
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Растёт при каждой очистке: значение, вычисленное до очистки, не должно попасть в кэш
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Значение по ключу или None, если его нет или срок хранения истёк"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Сохранить значение; если передан generation и кэш с тех пор очищался, значение не сохраняется"""
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
+
+class TokenUser:
+    """Пользователь, восстановленный из claims access токена (stateless режим)"""
+
+    def __init__(self, claims):
+        self.id = claims['user_id']
+        self.name = claims['name']
+        self.email = claims['email']
+        self.created_date = datetime.fromisoformat(claims['created_date'])
+
+# Пользователи, существование которых недавно подтверждено запросом к БД
+user_exists_cache = LRUCache(app.config['JWT_USER_CACHE_MAX_ENTRIES'])
+
+def user_exists(user_id):
+    """Проверка существования пользователя с кэшированием на JWT_USER_CHECK_TTL секунд"""
+    if user_exists_cache.get(user_id):
+        return True
+    generation = user_exists_cache.generation
+    exists = db.session.query(User.id).filter_by(id=user_id).first() is not None
+    if exists:
+        user_exists_cache.set(user_id, True, ttl=app.config['JWT_USER_CHECK_TTL'], generation=generation)
+    return exists
+
+class PasswordHasherBusy(Exception):
+    """Очередь хэширования паролей переполнена"""
+
+class PasswordHasher:
+    """Пул потоков для хэширования паролей.
+
+    Хэширование намеренно дорогое по CPU. Пул ограничивает число одновременных вычислений
+    PASSWORD_HASH_WORKERS потоками, а очередь - PASSWORD_HASH_MAX_PENDING задачами, поэтому
+    волна логинов не забирает все ядра у остальных запросов.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.slots = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                    thread_name_prefix='password-hash'
+                )
+                self.slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_MAX_PENDING'])
+
+    def run(self, func, *args, **kwargs):
+        """Выполнить func в пуле и дождаться результата; PasswordHasherBusy, если очередь заполнена"""
+        if not app.config['PASSWORD_HASH_WORKERS']:
+            return func(*args, **kwargs)
+        self.start()
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            return self.executor.submit(func, *args, **kwargs).result()
+        finally:
+            self.slots.release()
+
+password_hasher = PasswordHasher()
+
+def hash_password(password):
+    """Хэш пароля с текущими параметрами PASSWORD_HASH_METHOD"""
+    return password_hasher.run(generate_password_hash, password, method=app.config['PASSWORD_HASH_METHOD'])
+
+def password_hash_outdated(hashed_password):
+    """Хэш получен с параметрами, отличными от PASSWORD_HASH_METHOD"""
+    stored = hashed_password.split('$', 1)[0].split(':')
+    current = app.config['PASSWORD_HASH_METHOD'].split(':')
+    return stored[:len(current)] != current
+
+def verify_password(user, password):
+    """Проверка пароля пользователя. Хэш со старыми параметрами пересчитывается после успешного входа"""
+    if not password_hasher.run(check_password_hash, user.hashed_password, password):
+        return False
+    if password_hash_outdated(user.hashed_password):
+        try:
+            user.hashed_password = hash_password(password)
+        except PasswordHasherBusy:
+            # Пересчёт необязателен: при полной очереди оставляем старый хэш до следующего входа
+            return True
+        db.session.commit()
+    return True
+
+def overloaded_response():
+    """Ответ 503 при переполненной очереди хэширования"""
+    response = jsonify({'error': 'Сервер перегружен, повторите попытку позже'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+# Метрики запросов
+class Histogram:
+    """Гистограмма в духе Prometheus: число наблюдений по корзинам, сумма и количество"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        """Строки гистограммы: накопительные _bucket, _sum и _count"""
+        cumulative = 0
+        for bound, count in zip([*self.buckets, '+Inf'], self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+def metric_labels(**labels):
+    """Метки Prometheus с экранированием значений"""
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+
+class RequestMetrics:
+    """Метрики по эндпоинтам: время ответа, SQL запросы, размер ответа и запись JSON файлов"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.record = contextvars.ContextVar('metrics_record', default=None)
+        self.requests = {}
+        self.latency = {}
+        self.response_size = {}
+        self.sql = {}
+        self.json_writes = {}
+
+    def start_request(self):
+        self.record.set({'started': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0,
+                         'status': 500, 'size': 0})
+
+    def current(self):
+        return self.record.get()
+
+    def track_response(self, response):
+        """Статус и размер ответа; у потоковых ответов байты считаются по мере отдачи"""
+        record = self.current()
+        if record is None:
+            return
+        record['status'] = response.status_code
+        size = response.calculate_content_length()
+        if size is not None:
+            record['size'] = size
+        elif response.is_streamed:
+            response.response = self.count_bytes(response.response, record)
+
+    @staticmethod
+    def count_bytes(iterable, record):
+        try:
+            for chunk in iterable:
+                record['size'] += len(chunk.encode()) if isinstance(chunk, str) else len(chunk)
+                yield chunk
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    def observe_sql(self, duration):
+        record = self.current()
+        if record is not None:
+            record['sql_count'] += 1
+            record['sql_time'] += duration
+            return
+        with self.lock:
+            totals = self.sql.setdefault('(background)', [0, 0.0])
+            totals[0] += 1
+            totals[1] += duration
+
+    def finish_request(self, endpoint, method):
+        record = self.current()
+        if record is None:
+            return
+        self.record.set(None)
+        duration = time.perf_counter() - record['started']
+        key = (endpoint, method)
+        with self.lock:
+            status_key = (endpoint, method, record['status'])
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(app.config['METRICS_LATENCY_BUCKETS'])
+                self.response_size[key] = Histogram(app.config['METRICS_SIZE_BUCKETS'])
+            self.latency[key].observe(duration)
+            self.response_size[key].observe(record['size'])
+            totals = self.sql.setdefault(endpoint, [0, 0.0])
+            totals[0] += record['sql_count']
+            totals[1] += record['sql_time']
+
+    def observe_json_write(self, mode, duration):
+        with self.lock:
+            if mode not in self.json_writes:
+                self.json_writes[mode] = Histogram(app.config['METRICS_LATENCY_BUCKETS'])
+            self.json_writes[mode].observe(duration)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self.lock:
+            header('news_blog_http_requests_total', 'counter', 'Число HTTP запросов')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append('news_blog_http_requests_total{%s} %d'
+                             % (metric_labels(endpoint=endpoint, method=method, status=status), count))
+            header('news_blog_http_request_duration_seconds', 'histogram', 'Время обработки HTTP запроса')
+            for (endpoint, method), histogram in sorted(self.latency.items()):
+                lines.extend(histogram.samples('news_blog_http_request_duration_seconds',
+                                               metric_labels(endpoint=endpoint, method=method)))
+            header('news_blog_http_response_size_bytes', 'histogram', 'Размер тела HTTP ответа')
+            for (endpoint, method), histogram in sorted(self.response_size.items()):
+                lines.extend(histogram.samples('news_blog_http_response_size_bytes',
+                                               metric_labels(endpoint=endpoint, method=method)))
+            header('news_blog_sql_statements_total', 'counter', 'Число выполненных SQL запросов')
+            for endpoint, (count, _) in sorted(self.sql.items()):
+                lines.append('news_blog_sql_statements_total{%s} %d' % (metric_labels(endpoint=endpoint), count))
+            header('news_blog_sql_duration_seconds_total', 'counter', 'Суммарное время выполнения SQL запросов')
+            for endpoint, (_, duration) in sorted(self.sql.items()):
+                lines.append('news_blog_sql_duration_seconds_total{%s} %s'
+                             % (metric_labels(endpoint=endpoint), duration))
+            header('news_blog_json_snapshot_write_seconds', 'histogram', 'Время записи JSON файлов')
+            for mode, histogram in sorted(self.json_writes.items()):
+                lines.extend(histogram.samples('news_blog_json_snapshot_write_seconds', metric_labels(mode=mode)))
+        return '\n'.join(lines) + '\n'
+
+metrics = RequestMetrics()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def sql_started(conn, cursor, statement, parameters, context, executemany):
+    if app.config['METRICS_ENABLED']:
+        conn.info['metrics_sql_started'] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def sql_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('metrics_sql_started', None)
+    if started is not None:
+        metrics.observe_sql(time.perf_counter() - started)
+
+@app.before_request
+def metrics_start_request():
+    if app.config['METRICS_ENABLED']:
+        metrics.start_request()
+
+@app.after_request
+def metrics_track_response(response):
+    metrics.track_response(response)
+    return response
+
+@app.teardown_request
+def metrics_finish_request(exc):
+    # Запросы без маршрута (404, 405) учитываются вместе, чтобы не плодить метки
+    if request.endpoint:
+        metrics.finish_request(request.endpoint, request.method)
+    else:
+        metrics.finish_request('(unmatched)', '-')
+
+# Ограничение частоты запросов (token bucket)
+class MemoryRateLimitBackend:
+    """Корзины в памяти процесса (у каждого воркера свои)"""
+
+    def __init__(self):
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """Взять жетон из корзины key: (разрешено ли, сколько жетонов осталось)"""
+        with self.lock:
+            tokens, updated_at = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + max(now - updated_at, 0) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            while len(self.buckets) > app.config['RATE_LIMIT_MAX_KEYS']:
+                self.buckets.popitem(last=False)
+        return allowed, tokens
+
+class SqliteRateLimitBackend:
+    """Корзины в таблице rate_limit_bucket, общие для всех процессов.
+
+    Пополнение и списание жетона - один UPSERT с RETURNING в отдельной короткой транзакции,
+    поэтому одновременные запросы разных воркеров не списывают один жетон дважды.
+    """
+
+    TAKE = text("""
+        INSERT INTO rate_limit_bucket (key, tokens, updated_at, allowed) VALUES (:key, :capacity - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = min(:capacity, tokens + max(:now - updated_at, 0) * :rate)
+                - (min(:capacity, tokens + max(:now - updated_at, 0) * :rate) >= 1),
+            allowed = min(:capacity, tokens + max(:now - updated_at, 0) * :rate) >= 1,
+            updated_at = :now
+        RETURNING allowed, tokens
+    """)
+
+    def __init__(self):
+        self.purged_at = time.monotonic()
+
+    def take(self, key, capacity, rate, now):
+        with db.engine.begin() as connection:
+            allowed, tokens = connection.execute(
+                self.TAKE, {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+            ).one()
+            # Раз в минуту удаляем давно не использованные корзины
+            if time.monotonic() - self.purged_at > 60:
+                self.purged_at = time.monotonic()
+                connection.execute(
+                    db.delete(RateLimitBucket)
+                        .where(RateLimitBucket.updated_at < now - app.config['RATE_LIMIT_IDLE_SECONDS'])
+                )
+        return bool(allowed), tokens
+
+class RateLimiter:
+    """Token bucket на каждый эндпоинт из RATE_LIMITS и каждый ключ клиента"""
+
+    def __init__(self):
+        self.backends = {}
+        self.lock = threading.Lock()
+
+    def backend(self):
+        name = app.config['RATE_LIMIT_BACKEND']
+        with self.lock:
+            if name not in self.backends:
+                self.backends[name] = {'memory': MemoryRateLimitBackend, 'sqlite': SqliteRateLimitBackend}[name]()
+            return self.backends[name]
+
+    def take(self, endpoint, keys, capacity, rate):
+        """Списать жетон по каждому ключу; None, если запрос разрешён, иначе секунды до следующего жетона"""
+        backend = self.backend()
+        now = time.time()
+        retry_after = None
+        for key in keys:
+            allowed, tokens = backend.take(f'{endpoint}:{key}', capacity, rate, now)
+            if not allowed:
+                wait = max(1, math.ceil((1 - tokens) / rate))
+                retry_after = max(retry_after or 0, wait)
+        return retry_after
+
+rate_limiter = RateLimiter()
+
+def rate_limit_keys():
+    """Ключи корзин запроса: IP клиента и id пользователя из JWT, если токен корректен"""
+    keys = [f'ip:{request.remote_addr}']
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        try:
+            # Только проверка подписи (HMAC), без обращения к БД
+            data = jwt.decode(auth_header[7:], app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+            keys.append(f"user:{data['user_id']}")
+        except (jwt.InvalidTokenError, KeyError):
+            pass
+    return keys
+
+def rate_limited_response(retry_after):
+    """Ответ 429, когда жетоны клиента закончились"""
+    message = 'Слишком много запросов, повторите попытку позже'
+    if request.path.startswith('/api/'):
+        response = jsonify({'error': message})
+    else:
+        response = make_response(message)
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.before_request
+def apply_rate_limit():
+    # Зарегистрирован раньше остальных обработчиков с запросами к БД: отказ не трогает базу
+    # (кроме списания жетона с бэкендом 'sqlite')
+    if not app.config['RATE_LIMIT_ENABLED'] or request.method in ('GET', 'HEAD', 'OPTIONS'):
+        return None
+    budget = app.config['RATE_LIMITS'].get(request.endpoint)
+    if budget is None:
+        return None
+    retry_after = rate_limiter.take(request.endpoint, rate_limit_keys(), *budget)
+    if retry_after is not None:
+        return rate_limited_response(retry_after)
+    return None
+
 # JWT Middleware
 def token_required(f):
     @wraps(f)
@@ -84,10 +710,16 @@ def token_required(f):
                 
             current_user_id = data['user_id']
             
-            # Находим пользователя
-            current_user_obj = User.query.get(current_user_id)
-            if not current_user_obj:
-                return jsonify({'error': 'Пользователь не найден'}), 401
+            if app.config['JWT_STATELESS'] and 'name' in data:
+                # Данные пользователя уже подписаны в токене
+                current_user_obj = TokenUser(data)
+                if app.config['JWT_USER_CHECK_TTL'] and not user_exists(current_user_id):
+                    return jsonify({'error': 'Пользователь не найден'}), 401
+            else:
+                # Находим пользователя
+                current_user_obj = User.query.get(current_user_id)
+                if not current_user_obj:
+                    return jsonify({'error': 'Пользователь не найден'}), 401
                 
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Срок действия токена истек'}), 401
@@ -98,15 +730,20 @@ def token_required(f):
     
     return decorated
 
-def create_access_token(user_id):
+def create_access_token(user):
     """Создание access токена"""
     expires = datetime.utcnow() + app.config['JWT_ACCESS_TOKEN_EXPIRES']
     payload = {
-        'user_id': user_id,
+        'user_id': user.id,
         'exp': expires,
         'iat': datetime.utcnow(),
         'type': 'access'
     }
+    if app.config['JWT_STATELESS']:
+        # Claims, которых достаточно обработчикам API без загрузки пользователя из БД
+        payload['name'] = user.name
+        payload['email'] = user.email
+        payload['created_date'] = user.created_date.isoformat()
     return jwt.encode(payload, app.config['JWT_SECRET_KEY'], algorithm="HS256")
 
 def create_refresh_token(user_id):
@@ -118,13 +755,15 @@ def create_refresh_token(user_id):
         'user_id': user_id,
         'exp': expires,
         'iat': datetime.utcnow(),
-        'type': 'refresh'
+        'type': 'refresh',
+        # Уникальный id: иначе два логина за одну секунду дают одинаковый токен
+        'jti': secrets.token_hex(16)
     }
     token = jwt.encode(payload, app.config['JWT_SECRET_KEY'], algorithm="HS256")
     
-    # Сохраняем refresh токен в базу данных
+    # Сохраняем хэш refresh токена в базу данных
     refresh_token = RefreshToken(
-        token=token,
+        token_hash=hash_refresh_token(token),
         user_id=user_id,
         expires_at=expires
     )
@@ -133,15 +772,62 @@ def create_refresh_token(user_id):
     
     return token
 
+def hash_refresh_token(token):
+    """Хэш refresh токена, по которому он ищется в базе"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def find_refresh_token(token):
+    """Поиск refresh токена по хэшу"""
+    return RefreshToken.query.filter_by(token_hash=hash_refresh_token(token)).first()
+
 def revoke_refresh_token(token):
     """Отзыв refresh токена"""
-    refresh_token = RefreshToken.query.filter_by(token=token, revoked=False).first()
-    if refresh_token:
+    refresh_token = find_refresh_token(token)
+    if refresh_token and not refresh_token.revoked:
         refresh_token.revoked = True
         db.session.commit()
         return True
     return False
 
+def purge_refresh_tokens(batch_size=None):
+    """Удаление истёкших и отозванных refresh токенов пачками, возвращает число удалённых строк"""
+    batch_size = batch_size or app.config['REFRESH_TOKEN_PURGE_BATCH_SIZE']
+    total = 0
+    while True:
+        batch = db.select(RefreshToken.id).where(or_(
+            RefreshToken.expires_at < datetime.utcnow(),
+            RefreshToken.revoked == True
+        )).limit(batch_size)
+        result = db.session.execute(db.delete(RefreshToken).where(RefreshToken.id.in_(batch)))
+        db.session.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+refresh_token_purge_lock = threading.Lock()
+refresh_token_purged_at = None
+
+def schedule_refresh_token_purge():
+    """Фоновая очистка refresh токенов не чаще раза в REFRESH_TOKEN_PURGE_INTERVAL"""
+    global refresh_token_purged_at
+    now = datetime.utcnow()
+    if refresh_token_purged_at and now - refresh_token_purged_at < app.config['REFRESH_TOKEN_PURGE_INTERVAL']:
+        return
+    if not refresh_token_purge_lock.acquire(blocking=False):
+        return
+    refresh_token_purged_at = now
+
+    def run():
+        try:
+            with app.app_context():
+                purge_refresh_tokens()
+        except Exception:
+            app.logger.exception('Ошибка очистки refresh токенов')
+        finally:
+            refresh_token_purge_lock.release()
+
+    threading.Thread(target=run, name='refresh-token-purge', daemon=True).start()
+
 # Функции для работы с JSON файлами
 def init_json_files():
     """Инициализация JSON файлов если их нет"""
@@ -162,49 +848,735 @@ def load_json_data(filename):
 
 def save_json_data(filename, data):
     """Сохранение данных в JSON файл"""
-    with open(filename, 'w', encoding='utf-8') as f:
+    # Пишем во временный файл и подменяем им старый, чтобы читатели не увидели файл наполовину
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_filename, filename)
+
+class JsonSnapshot:
+    """Снимок таблицы в JSON файле с возможностью точечного обновления записей по id"""
+
+    def __init__(self, filename, date_field):
+        self.filename = filename
+        self.date_field = date_field
+        self.records = None
+
+    def load(self):
+        """Загрузка записей из файла при первом обращении"""
+        if self.records is None:
+            self.records = {item['id']: item for item in load_json_data(self.filename)}
+        return self.records
+
+    def reset(self):
+        """Забыть записи в памяти: при следующем обращении они перечитываются из файла"""
+        self.records = None
+
+    def replace_all(self, items):
+        """Полная замена содержимого снимка"""
+        self.records = {item['id']: item for item in items}
+        self.write()
+
+    def upsert(self, item):
+        self.load()[item['id']] = item
+
+    def remove(self, record_id):
+        self.load().pop(record_id, None)
+
+    def remove_where(self, predicate):
+        """Удаление записей по условию, возвращает количество удалённых"""
+        records = self.load()
+        removed = [key for key, item in records.items() if predicate(item)]
+        for record_id in removed:
+            del records[record_id]
+        return len(removed)
+
+    def write(self):
+        """Запись снимка в файл (сначала новые записи, как при полной выгрузке)"""
+        items = sorted(self.load().values(), key=lambda item: (item[self.date_field], item['id']), reverse=True)
+        save_json_data(self.filename, items)
+
+articles_snapshot = JsonSnapshot(ARTICLES_JSON, 'created_date')
+comments_snapshot = JsonSnapshot(COMMENTS_JSON, 'date')
+json_snapshot_lock = threading.RLock()
+json_changes_since_rebuild = 0
 
 def save_articles_to_json():
     """Сохранение всех статей из БД в JSON файл"""
-    articles = Article.query.order_by(Article.created_date.desc()).all()
-    articles_data = []
-    for article in articles:
-        articles_data.append({
-            'id': article.id,
-            'title': article.title,
-            'content': article.text,
-            'text': article.text,
-            'category': article.category,
-            'created_date': article.created_date.isoformat(),
-            'author_id': article.user_id,
-            'author_name': article.author.name if article.author else 'Неизвестный автор',
-            'comments_count': len(article.comments)
-        })
-    save_json_data(ARTICLES_JSON, articles_data)
+    articles = article_list_query().order_by(Article.created_date.desc()).all()
+    with json_snapshot_lock:
+        articles_snapshot.replace_all([article_to_dict(article) for article in articles])
 
 def save_comments_to_json():
     """Сохранение всех комментариев из БД в JSON файл"""
     comments = Comment.query.order_by(Comment.date.desc()).all()
-    comments_data = []
-    for comment in comments:
-        comments_data.append({
-            'id': comment.id,
-            'text': comment.text,
-            'author_name': comment.author_name,
-            'article_id': comment.article_id,
-            'date': comment.date.isoformat()
-        })
-    save_json_data(COMMENTS_JSON, comments_data)
+    with json_snapshot_lock:
+        comments_snapshot.replace_all([comment_to_dict(comment) for comment in comments])
 
 def save_all_json_files():
     """Сохранение всех данных в JSON файлы"""
-    save_articles_to_json()
-    save_comments_to_json()
+    global json_changes_since_rebuild
+    started = time.perf_counter()
+    with json_snapshot_lock:
+        save_articles_to_json()
+        save_comments_to_json()
+        json_changes_since_rebuild = 0
+    if app.config['METRICS_ENABLED']:
+        metrics.observe_json_write('full', time.perf_counter() - started)
+
+def save_json_changes(article_ids=(), comment_ids=()):
+    """Точечное обновление JSON файлов: перечитываются только изменённые статьи и комментарии.
+
+    Запись, которой больше нет в БД, удаляется из снимка. При удалении статьи из снимка
+    удаляются и её комментарии (в БД они удаляются каскадно). Периодически, а также в режиме
+    'full', файлы пересобираются полностью.
+    """
+    global json_changes_since_rebuild
+    with json_snapshot_lock:
+        if (app.config['JSON_SNAPSHOT_MODE'] != 'incremental'
+                or json_changes_since_rebuild >= app.config['JSON_SNAPSHOT_FULL_REBUILD_EVERY']):
+            save_all_json_files()
+            return
+
+        started = time.perf_counter()
+        article_ids = set(article_ids)
+        comments_changed = bool(comment_ids)
+        for comment_id in comment_ids:
+            comment = db.session.get(Comment, comment_id)
+            if comment:
+                comments_snapshot.upsert(comment_to_dict(comment))
+                # Меняется количество комментариев у статьи
+                article_ids.add(comment.article_id)
+            else:
+                comments_snapshot.remove(comment_id)
+
+        for article_id in article_ids:
+            article = article_list_query().filter(Article.id == article_id).first()
+            if article:
+                articles_snapshot.upsert(article_to_dict(article))
+            else:
+                articles_snapshot.remove(article_id)
+                if comments_snapshot.remove_where(lambda item: item['article_id'] == article_id):
+                    comments_changed = True
+
+        if article_ids:
+            articles_snapshot.write()
+        if comments_changed:
+            comments_snapshot.write()
+        json_changes_since_rebuild += 1
+    if app.config['METRICS_ENABLED']:
+        metrics.observe_json_write('incremental', time.perf_counter() - started)
+
+class JsonSnapshotWorker:
+    """Фоновый поток, выгружающий накопленные за окно debounce изменения в JSON файлы"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.article_ids = set()
+        self.comment_ids = set()
+        self.full_rebuild = False
+        self.dirty_generation = 0
+        self.exported_generation = 0
+        self.exported_at = None
+        self.thread = None
+
+    def mark_dirty(self, article_ids=(), comment_ids=(), full_rebuild=False):
+        """Отметить изменения для следующей выгрузки"""
+        with self.condition:
+            self.article_ids.update(article_ids)
+            self.comment_ids.update(comment_ids)
+            self.full_rebuild = self.full_rebuild or full_rebuild
+            self.dirty_generation += 1
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='json-snapshot-worker', daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def has_pending(self):
+        return self.exported_generation < self.dirty_generation
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.has_pending():
+                    self.condition.wait()
+            # Даём накопиться пачке изменений
+            time.sleep(app.config['JSON_SNAPSHOT_DEBOUNCE_SECONDS'])
+            self.export_pending()
+
+    def export_pending(self):
+        """Выгрузка всех накопленных изменений"""
+        with self.condition:
+            generation = self.dirty_generation
+            article_ids, self.article_ids = self.article_ids, set()
+            comment_ids, self.comment_ids = self.comment_ids, set()
+            full_rebuild, self.full_rebuild = self.full_rebuild, False
+        try:
+            with app.app_context():
+                if full_rebuild:
+                    save_all_json_files()
+                else:
+                    save_json_changes(article_ids, comment_ids)
+        except Exception:
+            app.logger.exception('Ошибка фоновой выгрузки JSON файлов')
+            # Снимок мог частично обновиться - восстанавливаем его полной пересборкой
+            with self.condition:
+                self.full_rebuild = True
+            time.sleep(app.config['JSON_SNAPSHOT_DEBOUNCE_SECONDS'])
+            return
+        with self.condition:
+            self.exported_generation = max(self.exported_generation, generation)
+            self.exported_at = datetime.utcnow()
+            self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Дождаться выгрузки всех изменений, отмеченных к этому моменту"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            target = self.dirty_generation
+            while self.exported_generation < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                if self.thread is None or not self.thread.is_alive():
+                    break
+                self.condition.wait(remaining)
+        if self.exported_generation < target:
+            self.export_pending()
+        return True
+
+    def status(self):
+        with self.condition:
+            return {
+                'generation': self.exported_generation,
+                'dirty_generation': self.dirty_generation,
+                'pending': self.has_pending(),
+                'exported_at': self.exported_at.isoformat() if self.exported_at else None
+            }
+
+json_snapshot_worker = JsonSnapshotWorker()
+
+def schedule_json_changes(article_ids=(), comment_ids=()):
+    """Обновление JSON файлов после коммита: в фоне или сразу, в зависимости от настроек"""
+    if app.config['JSON_SNAPSHOT_ASYNC']:
+        json_snapshot_worker.mark_dirty(article_ids, comment_ids)
+    else:
+        save_json_changes(article_ids, comment_ids)
+
+class DataVersion:
+    """Версия данных для ETag / Last-Modified: поколения статей и комментариев из общей таблицы cache_generation"""
+
+    # Поколения этих таблиц меняют ответы условных GET эндпоинтов
+    TABLES = ('article', 'comment')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = '0.0'
+        self.modified_at = datetime.utcfromtimestamp(0)
+
+    def publish(self):
+        """Взять поколения, известные CacheSync; вызывается после обновления кэшей процесса"""
+        generations = [cache_sync.get(name) for name in self.TABLES]
+        with self.lock:
+            self.version = '.'.join(str(generation) for generation, modified_at in generations)
+            self.modified_at = datetime.utcfromtimestamp(max(modified_at for generation, modified_at in generations))
+
+    def current(self, article_id=None):
+        """(ETag, Last-Modified) всех данных или одной статьи; одинаковы во всех процессах"""
+        with self.lock:
+            version, modified_at = self.version, self.modified_at
+        scope = 'all' if article_id is None else f'article-{article_id}'
+        return f'{scope}-{version}', modified_at
+
+data_version = DataVersion()
+
+class ArticleSummary:
+    """Статья в ленте последних: поля карточки и готовый словарь для API"""
+
+    __slots__ = ('id', 'title', 'excerpt', 'category', 'created_date', 'author_name', 'data')
+
+    def __init__(self, article):
+        self.data = article_to_dict(article)
+        self.id = article.id
+        self.title = article.title
+        self.excerpt = article.excerpt
+        self.category = article.category
+        self.created_date = article.created_date
+        self.author_name = self.data['author_name']
+
+    def sort_key(self):
+        return self.created_date, self.id
+
+    def to_dict(self, fields=None):
+        """То же, что article_to_dict(article, fields) для исходной статьи"""
+        if fields is None:
+            return self.data
+        return {field: self.data[field] for field in ARTICLE_FIELD_COLUMNS if field in fields}
+
+class LatestArticlesFeed:
+    """Лента LATEST_FEED_SIZE новейших статей всего и по каждой категории, обновляемая при записи"""
+
+    def __init__(self):
+        # Раздел -> (статьи в порядке created_date DESC, id DESC; в списке все статьи раздела).
+        # Списки не меняются на месте, а заменяются, поэтому читатели не берут блокировку
+        self.feeds = None
+        self.rebuilds = 0
+        self.lock = threading.RLock()
+
+    def query(self, category=None, limit=None):
+        """Первые limit статей раздела из БД и признак, что за ними есть ещё"""
+        limit = limit or app.config['LATEST_FEED_SIZE']
+        query = article_list_query()
+        if category is not None:
+            query = query.filter(Article.category == category)
+        articles = query.order_by(Article.created_date.desc(), Article.id.desc()).limit(limit + 1).all()
+        return [ArticleSummary(article) for article in articles[:limit]], len(articles) > limit
+
+    def rebuild(self):
+        """Сборка ленты из БД"""
+        with self.lock:
+            feeds = {}
+            for category in [None] + VALID_CATEGORIES:
+                items, has_more = self.query(category)
+                feeds[category] = (items, not has_more)
+            self.feeds = feeds
+            self.rebuilds += 1
+            return feeds
+
+    def invalidate(self):
+        """Сбросить ленту (например, после изменения данных в обход эндпоинтов)"""
+        with self.lock:
+            self.feeds = None
+
+    def page(self, category=None, limit=None):
+        """Первые limit статей раздела и признак, что за ними есть ещё.
+
+        None - ответить из памяти нельзя: limit больше ленты, а в БД есть статьи сверх неё.
+        """
+        feeds = self.feeds
+        if feeds is None:
+            with self.lock:
+                # Пока ждали блокировку, ленту мог собрать другой поток
+                feeds = self.feeds if self.feeds is not None else self.rebuild()
+        items, complete = feeds[category]
+        limit = limit or app.config['LATEST_FEED_SIZE']
+        if limit > len(items) and not complete:
+            return None
+        return items[:limit], limit < len(items) or not complete
+
+    def apply(self, article_ids):
+        """Применить изменения статей article_ids (после коммита)"""
+        article_ids = set(article_ids)
+        if not article_ids:
+            return
+        with self.lock:
+            if self.feeds is None:
+                return
+            if len(article_ids) > app.config['LATEST_FEED_SIZE']:
+                self.invalidate()
+                return
+            articles = {article.id: ArticleSummary(article)
+                        for article in article_list_query().filter(Article.id.in_(article_ids)).all()}
+            feeds = dict(self.feeds)
+            for category, (items, complete) in feeds.items():
+                for article_id in article_ids:
+                    placed = self.place(items, complete, article_id, articles.get(article_id), category)
+                    if placed is None:
+                        self.invalidate()
+                        return
+                    items, complete = placed
+                feeds[category] = (items, complete)
+            self.feeds = feeds
+
+    @staticmethod
+    def place(items, complete, article_id, summary, category):
+        """Новый список с учётом изменения одной статьи (summary=None - статья удалена) или None"""
+        belongs = summary is not None and (category is None or summary.category == category)
+        position = next((i for i, item in enumerate(items) if item.id == article_id), None)
+        if position is None and not belongs:
+            return items, complete
+        items = list(items)
+        if position is not None:
+            del items[position]
+            if not belongs:
+                # Статья ушла из раздела: в неполном списке её место должна занять следующая из БД
+                return (items, complete) if complete else None
+        # Новая для списка статья старше последней в неполном списке в ленту не попадает
+        if position is None and not complete and summary.sort_key() < items[-1].sort_key():
+            return items, complete
+        position = next((i for i, item in enumerate(items) if item.sort_key() < summary.sort_key()), len(items))
+        items.insert(position, summary)
+        if len(items) > app.config['LATEST_FEED_SIZE']:
+            items.pop()
+            complete = False
+        return items, complete
+
+    def stats(self):
+        feeds = self.feeds
+        return {
+            'built': feeds is not None,
+            'rebuilds': self.rebuilds,
+            'entries': {category or 'all': len(items) for category, (items, _) in feeds.items()} if feeds else {}
+        }
+
+latest_feed = LatestArticlesFeed()
+
+def notify_data_changed(article_ids=(), comment_ids=()):
+    """Вызывается после коммита любой записи статей и комментариев.
+
+    article_ids - статьи, представление которых изменилось (включая количество комментариев
+    и сами комментарии статьи), comment_ids - изменённые комментарии.
+    """
+    # Сначала обновляются представления в памяти, потом версия: иначе читатель получил бы
+    # новый ETag со старым телом и дальше 304 на устаревшие данные
+    latest_feed.apply(article_ids)
+    page_cache.clear()
+    schedule_json_changes(article_ids, comment_ids)
+    data_version.publish()
+
+def is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+    """Копия клиента актуальна: If-None-Match (приоритетнее) или If-Modified-Since"""
+    if if_none_match:
+        return if_none_match.contains(etag)
+    if if_modified_since:
+        return last_modified <= if_modified_since.replace(tzinfo=None)
+    return False
+
+def conditional_get(per_article=False):
+    """Декоратор GET эндпоинтов: ETag / Last-Modified по версии данных и ответ 304 без запросов к БД.
+
+    per_article - версия берётся по статье из параметра маршрута id.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            etag, last_modified = data_version.current(kwargs.get('id') if per_article else None)
+            if is_not_modified(etag, last_modified, request.if_none_match, request.if_modified_since):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            return response
+        return decorated
+    return decorator
+
+page_cache = LRUCache(app.config['PAGE_CACHE_MAX_ENTRIES'])
+
+def cached_page(f):
+    """Декоратор страниц: HTML для гостей берётся из page_cache (кроме страниц с flash-сообщениями)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not app.config['PAGE_CACHE_ENABLED'] or '_flashes' in session or current_user.is_authenticated:
+            return f(*args, **kwargs)
+
+        # Дата - из-за бейджа "Новое!"
+        key = (request.endpoint, tuple(sorted(kwargs.items())), date.today())
+        body = page_cache.get(key)
+        if body is None:
+            generation = page_cache.generation
+            body = f(*args, **kwargs)
+            # Кэшируются только обычные страницы, ответы с кодом ошибки возвращаются как есть
+            if not isinstance(body, str):
+                return body
+            page_cache.set(key, body, generation=generation)
+        return body
+    return decorated
+
+def flush_json_snapshots(timeout=None):
+    """Принудительно дописать отложенные изменения в JSON файлы"""
+    return json_snapshot_worker.flush(timeout)
+
+# При остановке процесса не теряем последние изменения
+atexit.register(flush_json_snapshots, 5)
+
+class JsonFileCache:
+    """Кэш готовых ответов для /api/json/*.
+
+    Хранит уже сериализованное тело ответа и перечитывает файл, только если изменились
+    mtime, размер файла или поколение фоновой выгрузки. На попадание приходится один stat().
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_body(self, filename):
+        try:
+            stat = os.stat(filename)
+            key = (stat.st_mtime_ns, stat.st_size, json_snapshot_worker.exported_generation)
+        except FileNotFoundError:
+            key = None
+
+        with self.lock:
+            entry = self.entries.get(filename)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        body = app.json.response(load_json_data(filename)).get_data()
+        with self.lock:
+            self.entries[filename] = (key, body)
+        return body
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
+
+json_file_cache = JsonFileCache()
+
+def json_file_response(filename):
+    """Ответ с содержимым JSON файла из кэша"""
+    return app.response_class(json_file_cache.get_body(filename), mimetype=app.json.mimetype)
+
+def add_snapshot_headers(response):
+    """Заголовки со свежестью JSON снимка для эндпоинтов /api/json/*"""
+    status = json_snapshot_worker.status()
+    response.headers['X-Snapshot-Generation'] = str(status['generation'])
+    response.headers['X-Snapshot-Dirty-Generation'] = str(status['dirty_generation'])
+    if status['exported_at']:
+        response.headers['X-Snapshot-Exported-At'] = status['exported_at']
+    return response
+
+# Согласование кэшей между процессами: транзакция сессии, записавшая в таблицы
+# CACHE_GENERATION_TABLES (через ORM объекты или insert/update/delete), в том же коммите
+# увеличивает их поколения в cache_generation
+@event.listens_for(Session, 'after_flush')
+def track_flushed_tables(session, flush_context):
+    tables = session.info.setdefault('changed_tables', set())
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if instance.__table__.name in CACHE_GENERATION_TABLES:
+            tables.add(instance.__table__.name)
+    if any(isinstance(instance, User) for instance in session.deleted):
+        session.info['users_deleted'] = True
+
+@event.listens_for(Session, 'do_orm_execute')
+def track_executed_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        name = orm_execute_state.statement.table.name
+        if name in CACHE_GENERATION_TABLES:
+            orm_execute_state.session.info.setdefault('changed_tables', set()).add(name)
+        if orm_execute_state.is_delete and name == 'user':
+            orm_execute_state.session.info['users_deleted'] = True
+
+@event.listens_for(Session, 'before_commit')
+def bump_cache_generations(session):
+    # Изменения объектов попадают в changed_tables при flush, поэтому он делается здесь, до UPDATE
+    session.flush()
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        rows = session.execute(
+            db.update(CacheGeneration)
+                .where(CacheGeneration.name.in_(tables))
+                .values(generation=CacheGeneration.generation + 1,
+                        modified_at=func.max(CacheGeneration.modified_at + 1, int(time.time())))
+                .returning(CacheGeneration.name, CacheGeneration.generation, CacheGeneration.modified_at)
+        ).all()
+        session.info['bumped_generations'] = {name: (generation, modified_at) for name, generation, modified_at in rows}
+
+@event.listens_for(Session, 'after_commit')
+def remember_cache_generations(session):
+    generations = session.info.pop('bumped_generations', None)
+    if generations:
+        cache_sync.own_write(generations)
+    # Удалённый пользователь не должен проходить проверку stateless токена до истечения TTL
+    if session.info.pop('users_deleted', False):
+        user_exists_cache.clear()
+
+@event.listens_for(Session, 'after_rollback')
+def forget_cache_generations(session):
+    session.info.pop('changed_tables', None)
+    session.info.pop('bumped_generations', None)
+    session.info.pop('users_deleted', None)
+
+class CacheSync:
+    """Сброс кэшей процесса после записей других процессов по поколениям из cache_generation"""
+
+    def __init__(self):
+        self.known = {}
+        self.checked_at = time.monotonic()
+        self.resets = 0
+        self.lock = threading.Lock()
+
+    def read(self):
+        with db.engine.connect() as connection:
+            rows = connection.execute(
+                db.select(CacheGeneration.name, CacheGeneration.generation, CacheGeneration.modified_at)
+            ).all()
+        return {name: (generation, modified_at) for name, generation, modified_at in rows}
+
+    def load(self):
+        """Создание строк cache_generation, если их нет, и чтение текущих поколений"""
+        db.session.execute(
+            db.insert(CacheGeneration).prefix_with('OR IGNORE'),
+            [{'name': name, 'generation': 0, 'modified_at': int(time.time())} for name in CACHE_GENERATION_TABLES]
+        )
+        db.session.commit()
+        generations = self.read()
+        with self.lock:
+            self.known = generations
+            self.checked_at = time.monotonic()
+        data_version.publish()
+
+    def get(self, name):
+        """(поколение, время записи) таблицы, известные процессу"""
+        with self.lock:
+            return self.known.get(name, (0, 0))
+
+    def own_write(self, generations):
+        """Поколения после коммита записи этого процесса"""
+        skipped = set()
+        with self.lock:
+            for name, (generation, modified_at) in generations.items():
+                known = self.known.get(name, (0, 0))[0]
+                if generation > known:
+                    self.known[name] = (generation, modified_at)
+                    # Ровно на единицу - между записями никто не писал, кэши обновит notify_data_changed().
+                    # Иначе до этой записи писал другой процесс, и его изменения тоже нужно учесть
+                    if generation > known + 1:
+                        skipped.add(name)
+        if skipped:
+            self.drop_caches(skipped)
+
+    def due(self):
+        return (app.config['CACHE_SYNC_ENABLED']
+                and time.monotonic() - self.checked_at >= app.config['CACHE_SYNC_INTERVAL'])
+
+    def check(self):
+        """Сверка поколений с базой и сброс кэшей изменённых другими процессами таблиц"""
+        self.checked_at = time.monotonic()
+        generations = self.read()
+        with self.lock:
+            changed = {name for name, (generation, modified_at) in generations.items()
+                       if generation > self.known.get(name, (0, 0))[0]}
+            for name in changed:
+                self.known[name] = generations[name]
+        if changed:
+            self.drop_caches(changed)
+        return changed
+
+    def drop_caches(self, tables):
+        """Сброс кэшей, зависящих от таблиц tables; новая версия данных публикуется последней"""
+        self.resets += 1
+        if 'user' in tables:
+            user_exists_cache.clear()
+        if 'article' in tables or 'comment' in tables:
+            page_cache.clear()
+            if 'article' in tables:
+                latest_feed.invalidate()
+            with json_snapshot_lock:
+                if 'article' in tables:
+                    articles_snapshot.reset()
+                if 'comment' in tables:
+                    comments_snapshot.reset()
+            json_file_cache.clear()
+            data_version.publish()
+
+    def stats(self):
+        with self.lock:
+            return {'generations': {name: generation for name, (generation, modified_at) in self.known.items()},
+                    'resets': self.resets}
+
+cache_sync = CacheSync()
+
+@app.before_request
+def sync_shared_caches():
+    if cache_sync.due():
+        cache_sync.check()
+
+# Поля статьи в API и колонки, которые нужны для каждого из них
+ARTICLE_FIELD_COLUMNS = {
+    'id': [],
+    'title': ['title'],
+    'content': ['text'],
+    'text': ['text'],
+    'category': ['category'],
+    'created_date': ['created_date'],
+    'author_id': ['user_id'],
+    'author_name': ['user_id'],
+    'comments_count': ['comments_count'],
+}
+
+def article_list_query(fields=None):
+    """Запрос статей для списков без N+1: автор подгружается JOIN-ом,
+    количество комментариев хранится в самой статье.
+
+    fields - набор полей API; остальные колонки не читаются из БД (в том числе тяжёлый text),
+    JOIN с автором делается, только если запрошено author_name.
+    """
+    return Article.query.options(*article_list_options(fields))
+
+def article_list_options(fields=None):
+    """Опции загрузки статей для article_list_query (подходят и для db.select(Article))"""
+    options = []
+    if fields is None or 'author_name' in fields:
+        options.append(joinedload(Article.author))
+    if fields is not None:
+        # created_date нужна всегда: по ней сортируются списки и строится курсор
+        columns = {'created_date'}
+        for field in fields:
+            columns.update(ARTICLE_FIELD_COLUMNS[field])
+        options.append(load_only(*[getattr(Article, column) for column in sorted(columns)]))
+    return options
+
+def article_card_query():
+    """Статьи для карточек на страницах списков: автор JOIN-ом, вместо текста - excerpt"""
+    return Article.query.options(
+        joinedload(Article.author),
+        load_only(Article.title, Article.excerpt, Article.category, Article.created_date, Article.user_id)
+    )
+
+def get_article_fields():
+    """Набор полей статьи из ?fields= и ?text_alias=; None - все поля. При ошибке - ValueError"""
+    return parse_article_fields(request.args.get('fields'), request.args.get('text_alias'))
+
+def parse_article_fields(fields, text_alias=None):
+    """Разбор значений параметров fields и text_alias (см. get_article_fields)"""
+    if text_alias is None:
+        text_alias = '1' if app.config['API_ARTICLE_TEXT_ALIAS'] else '0'
+    if fields:
+        fields = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = fields - ARTICLE_FIELD_COLUMNS.keys()
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+    elif text_alias in ('0', 'false'):
+        fields = set(ARTICLE_FIELD_COLUMNS) - {'text'}
+    else:
+        fields = None
+    return fields
+
+def change_comments_count(article_id, delta):
+    """Изменение счётчика комментариев статьи, вызывается до commit() вместе с изменением комментариев"""
+    Article.query.filter_by(id=article_id).update(
+        {Article.comments_count: Article.comments_count + delta},
+        synchronize_session=False
+    )
+
+def backfill_excerpts():
+    """Пересчёт превью всех статей по их текстам (substr в SQLite считает символы, как срез строки)"""
+    db.session.execute(db.update(Article).values(excerpt=func.substr(Article.text, 1, EXCERPT_LENGTH + 1)))
+    db.session.commit()
+
+def recount_comments():
+    """Пересчёт счётчиков комментариев всех статей по таблице комментариев"""
+    counts = db.select(func.count(Comment.id)).where(Comment.article_id == Article.id).scalar_subquery()
+    db.session.execute(db.update(Article).values(comments_count=counts))
+    db.session.commit()
 
 # Функции для преобразования объектов в словари
-def article_to_dict(article):
-    """Конвертирует объект статьи в словарь для API"""
+def article_to_dict(article, fields=None):
+    """Конвертирует объект статьи в словарь для API (только поля fields, если они заданы)"""
+    if fields is not None:
+        return {field: ARTICLE_FIELD_GETTERS[field](article) for field in ARTICLE_FIELD_COLUMNS if field in fields}
     return {
         'id': article.id,
         'title': article.title,
@@ -214,9 +1586,47 @@ def article_to_dict(article):
         'created_date': article.created_date.isoformat(),
         'author_id': article.user_id,
         'author_name': article.author.name if article.author else 'Неизвестный автор',
-        'comments_count': len(article.comments)
+        'comments_count': article.comments_count
     }
 
+ARTICLE_FIELD_GETTERS = {
+    'id': lambda article: article.id,
+    'title': lambda article: article.title,
+    'content': lambda article: article.text,
+    'text': lambda article: article.text,
+    'category': lambda article: article.category,
+    'created_date': lambda article: article.created_date.isoformat(),
+    'author_id': lambda article: article.user_id,
+    'author_name': lambda article: article.author.name if article.author else 'Неизвестный автор',
+    'comments_count': lambda article: article.comments_count,
+}
+
+def article_list_response(category=None):
+    """Ответ списочного API статей (всех или категории category) с учётом ?fields= / ?text_alias=.
+
+    Первая страница (?limit= без cursor) отдаётся из latest_feed без запросов к БД.
+    """
+    try:
+        fields = get_article_fields()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if app.config['LATEST_FEED_ENABLED'] and request.args.get('limit') and not request.args.get('cursor'):
+        try:
+            limit, _ = get_page_args()
+        except ValueError:
+            limit = None
+        page = latest_feed.page(category, limit) if limit else None
+        if page is not None:
+            items, has_more = page
+            return jsonify({
+                'items': [summary.to_dict(fields) for summary in items],
+                'next_cursor': encode_cursor(items[-1].created_date, items[-1].id) if has_more else None
+            })
+    query = article_list_query(fields)
+    if category is not None:
+        query = query.filter(Article.category == category)
+    return list_response(query, Article.created_date, Article.id, lambda article: article_to_dict(article, fields))
+
 def comment_to_dict(comment):
     """Конвертирует объект комментария в словарь для API"""
     return {
@@ -227,6 +1637,137 @@ def comment_to_dict(comment):
         'date': comment.date.isoformat()
     }
 
+# Keyset пагинация: курсор хранит (дата, id) последней записи страницы
+def encode_cursor(sort_value, record_id):
+    """Упаковка позиции в непрозрачный курсор"""
+    raw = json.dumps([sort_value.isoformat(), record_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Распаковка курсора, при некорректном значении - ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, record_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), int(record_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Некорректный курсор')
+
+def get_page_args():
+    """Разбор параметров ?limit= и ?cursor=. Без limit пагинация выключена"""
+    return parse_page_args(request.args.get('limit'), request.args.get('cursor'))
+
+def parse_page_args(limit, cursor):
+    """Разбор значений параметров limit и cursor: (limit, позиция курсора). При ошибке - ValueError"""
+    if limit is None:
+        if cursor is not None:
+            raise ValueError('Параметр cursor требует limit')
+        return None, None
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError('limit должен быть положительным')
+    limit = min(limit, app.config['API_PAGE_MAX_LIMIT'])
+    return limit, decode_cursor(cursor) if cursor else None
+
+def keyset_query(query, date_column, id_column, limit, cursor=None):
+    """Запрос страницы по убыванию (дата, id) без OFFSET - диапазонное чтение по индексу"""
+    if cursor is not None:
+        cursor_date, cursor_id = cursor
+        query = query.filter(or_(
+            date_column < cursor_date,
+            and_(date_column == cursor_date, id_column < cursor_id)
+        ))
+    # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+    return query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1)
+
+def keyset_page(query, date_column, id_column, limit, cursor=None):
+    """Страница записей и курсор следующей страницы"""
+    return split_keyset_page(keyset_query(query, date_column, id_column, limit, cursor).all(), date_column, limit)
+
+def split_keyset_page(items, date_column, limit):
+    """Результат keyset_query: первые limit записей и курсор следующей страницы (если она есть)"""
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), last.id)
+    return items, next_cursor
+
+def stream_json_list(query, to_dict):
+    """Потоковый ответ с JSON массивом: строки читаются из БД пачками (yield_per) и сразу
+    отдаются клиенту, поэтому память не зависит от размера таблицы.
+
+    Байты ответа совпадают с jsonify() для того же списка (включая отступы в режиме отладки).
+    """
+    def generate():
+        writer = JsonArrayWriter()
+        yield writer.start()
+        for item in query.yield_per(app.config['API_STREAM_BATCH_SIZE']):
+            chunk = writer.add(to_dict(item))
+            if chunk:
+                yield chunk
+        yield writer.finish()
+
+    return app.response_class(stream_with_context(generate()), mimetype=app.json.mimetype)
+
+class JsonArrayWriter:
+    """Сериализация JSON массива по элементам с буферизацией (~64 КБ на кусок ответа).
+
+    Склеенные куски совпадают с jsonify() для того же списка (включая отступы в режиме отладки).
+    """
+
+    def __init__(self):
+        provider = app.json
+        self.pretty = provider.compact is False or (provider.compact is None and app.debug)
+        self.dump_args = {'indent': 2} if self.pretty else {'separators': (',', ':')}
+        self.separator = ',\n  ' if self.pretty else ','
+        self.buffer = []
+        self.buffered = 0
+        self.first = True
+
+    def start(self):
+        return '['
+
+    def add(self, item):
+        """Добавить элемент; возвращает накопленный кусок ответа или пустую строку"""
+        chunk = app.json.dumps(item, **self.dump_args)
+        if self.pretty:
+            chunk = chunk.replace('\n', '\n  ')
+        self.buffer.append(('\n  ' if self.pretty else '') + chunk if self.first else self.separator + chunk)
+        self.buffered += len(chunk)
+        self.first = False
+        if self.buffered < 65536:
+            return ''
+        chunk = ''.join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        return chunk
+
+    def finish(self):
+        if self.pretty and not self.first:
+            self.buffer.append('\n')
+        self.buffer.append(']\n')
+        return ''.join(self.buffer)
+
+def list_response(query, date_column, id_column, to_dict):
+    """Ответ списочного API: весь список или страница с next_cursor, если передан ?limit=.
+    С ?stream=1 полный список отдаётся потоком"""
+    try:
+        limit, cursor = get_page_args()
+    except ValueError:
+        return jsonify({'error': 'Некорректные параметры пагинации'}), 400
+
+    if limit is None:
+        query = query.order_by(date_column.desc(), id_column.desc())
+        if request.args.get('stream') in ('1', 'true'):
+            return stream_json_list(query, to_dict)
+        return jsonify([to_dict(item) for item in query.all()])
+
+    items, next_cursor = keyset_page(query, date_column, id_column, limit, cursor)
+    return jsonify({
+        'items': [to_dict(item) for item in items],
+        'next_cursor': next_cursor
+    })
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -242,12 +1783,16 @@ def api_login():
     
     user = User.query.filter_by(email=data['email']).first()
     
-    if not user or not check_password_hash(user.hashed_password, data['password']):
-        return jsonify({'error': 'Неверный email или пароль'}), 401
+    try:
+        if not user or not verify_password(user, data['password']):
+            return jsonify({'error': 'Неверный email или пароль'}), 401
+    except PasswordHasherBusy:
+        return overloaded_response()
     
     # Создаем токены
-    access_token = create_access_token(user.id)
+    access_token = create_access_token(user)
     refresh_token = create_refresh_token(user.id)
+    schedule_refresh_token_purge()
     
     return jsonify({
         'message': 'Аутентификация успешна',
@@ -278,13 +1823,9 @@ def api_refresh():
             return jsonify({'error': 'Неверный тип токена'}), 401
         
         # Проверяем существование токена в базе данных
-        refresh_token = RefreshToken.query.filter_by(
-            token=refresh_token_str, 
-            revoked=False,
-            user_id=payload['user_id']
-        ).first()
+        refresh_token = find_refresh_token(refresh_token_str)
         
-        if not refresh_token:
+        if not refresh_token or refresh_token.revoked or refresh_token.user_id != payload['user_id']:
             return jsonify({'error': 'Refresh токен недействителен или отозван'}), 401
         
         if refresh_token.expires_at < datetime.utcnow():
@@ -292,8 +1833,12 @@ def api_refresh():
             db.session.commit()
             return jsonify({'error': 'Срок действия refresh токена истек'}), 401
         
+        user = db.session.get(User, payload['user_id'])
+        if not user:
+            return jsonify({'error': 'Пользователь не найден'}), 401
+        
         # Создаем новый access токен
-        new_access_token = create_access_token(payload['user_id'])
+        new_access_token = create_access_token(user)
         
         return jsonify({
             'message': 'Токен успешно обновлен',
@@ -333,10 +1878,15 @@ def api_get_current_user(current_user):
 
 # Существующие маршруты остаются без изменений
 @app.route('/')
+@cached_page
 def index():
-    articles = Article.query.order_by(Article.created_date.desc()).all()
+    # Главная показывает LATEST_FEED_SIZE новейших статей, остальные - на странице /articles
+    if app.config['LATEST_FEED_ENABLED']:
+        articles, has_more = latest_feed.page()
+    else:
+        articles, has_more = latest_feed.query()
     today = date.today()
-    return render_template('index.html', articles=articles, today=today)
+    return render_template('index.html', articles=articles, has_more=has_more, today=today)
 
 @app.route('/about')
 def about():
@@ -387,16 +1937,28 @@ def news_detail(id):
                 article_id=id
             )
             db.session.add(comment)
+            change_comments_count(id, 1)
             db.session.commit()
             # Обновляем JSON файл после добавления комментария
-            save_all_json_files()
+            notify_data_changed(article_ids=[id], comment_ids=[comment.id])
             
             flash('Комментарий успешно добавлен!', 'success')
             return redirect(url_for('news_detail', id=id))
         else:
             flash('Пожалуйста, заполните все поля', 'error')
     
-    return render_template('news_detail.html', article=article, today=date.today())
+    # Первая страница комментариев (или страница после ?cursor= без JavaScript) - диапазонное
+    # чтение по индексу (article_id, date, id) вместо загрузки и сортировки всех комментариев
+    try:
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        cursor = None
+    comments, next_cursor = keyset_page(
+        Comment.query.filter(Comment.article_id == id), Comment.date, Comment.id,
+        app.config['COMMENTS_PAGE_SIZE'], cursor
+    )
+    return render_template('news_detail.html', article=article, comments=comments, next_cursor=next_cursor,
+                           today=date.today())
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -409,10 +1971,16 @@ def register():
             flash('Пользователь с таким email уже существует', 'error')
             return render_template('register.html')
         
+        try:
+            hashed_password = hash_password(password)
+        except PasswordHasherBusy:
+            flash('Сервер перегружен, повторите попытку позже', 'error')
+            return render_template('register.html'), 503, {'Retry-After': '1'}
+        
         user = User(
             name=name,
             email=email,
-            hashed_password=generate_password_hash(password)
+            hashed_password=hashed_password
         )
         db.session.add(user)
         db.session.commit()
@@ -429,7 +1997,13 @@ def login():
         password = request.form.get('password')
         
         user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.hashed_password, password):
+        try:
+            password_ok = user is not None and verify_password(user, password)
+        except PasswordHasherBusy:
+            flash('Сервер перегружен, повторите попытку позже', 'error')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+        
+        if password_ok:
             login_user(user)
             flash('Вы успешно вошли в систему!', 'success')
             next_page = request.args.get('next')
@@ -464,7 +2038,7 @@ def create_article():
             db.session.add(article)
             db.session.commit()
             # Обновляем JSON файл после создания статьи
-            save_all_json_files()
+            notify_data_changed(article_ids=[article.id])
             
             flash('Статья успешно создана!', 'success')
             return redirect(url_for('index'))
@@ -485,10 +2059,11 @@ def edit_article(id):
     if request.method == 'POST':
         article.title = request.form.get('title')
         article.text = request.form.get('text')
+        article.excerpt = make_excerpt(article.text)
         article.category = request.form.get('category', 'general')
         db.session.commit()
         # Обновляем JSON файл после редактирования статьи
-        save_all_json_files()
+        notify_data_changed(article_ids=[id])
         
         flash('Статья успешно обновлена!', 'success')
         return redirect(url_for('news_detail', id=id))
@@ -508,23 +2083,24 @@ def delete_article(id):
     db.session.delete(article)
     db.session.commit()
     # Обновляем JSON файл после удаления статьи
-    save_all_json_files()
+    notify_data_changed(article_ids=[id])
     
     flash('Статья успешно удалена!', 'success')
     return redirect(url_for('index'))
 
 @app.route('/articles')
+@cached_page
 def articles_list():
-    articles = Article.query.order_by(Article.created_date.desc()).all()
+    articles = article_card_query().order_by(Article.created_date.desc()).all()
     return render_template('articles_list.html', articles=articles)
 
 @app.route('/articles/<category>')
+@cached_page
 def articles_by_category(category):
-    valid_categories = ['technology', 'science', 'culture', 'sports', 'general']
-    if category not in valid_categories:
+    if category not in VALID_CATEGORIES:
         return "Категория не найдена", 404
     
-    articles = Article.query.filter_by(category=category).order_by(Article.created_date.desc()).all()
+    articles = article_card_query().filter_by(category=category).order_by(Article.created_date.desc()).all()
     return render_template('articles_list.html', articles=articles, category=category)
 
 # Обновленные API эндпоинты с JWT защитой
@@ -547,7 +2123,7 @@ def api_create_article(current_user):
     db.session.add(article)
     db.session.commit()
     # Обновляем JSON файл после создания статьи через API
-    save_all_json_files()
+    notify_data_changed(article_ids=[article.id])
     
     return jsonify(article_to_dict(article)), 201
 
@@ -573,12 +2149,13 @@ def api_update_article(current_user, id):
         article.title = data['title']
     if 'content' in data:
         article.text = data['content']
+        article.excerpt = make_excerpt(article.text)
     if 'category' in data:
         article.category = data['category']
     
     db.session.commit()
     # Обновляем JSON файл после обновления статьи через API
-    save_all_json_files()
+    notify_data_changed(article_ids=[article.id])
     
     return jsonify(article_to_dict(article))
 
@@ -598,7 +2175,7 @@ def api_delete_article(current_user, id):
     db.session.delete(article)
     db.session.commit()
     # Обновляем JSON файл после удаления статьи через API
-    save_all_json_files()
+    notify_data_changed(article_ids=[id])
     
     return jsonify({'message': 'Статья удалена', 'article': article_to_dict(article)})
 
@@ -624,50 +2201,255 @@ def api_create_comment(current_user):
     )
     
     db.session.add(comment)
+    change_comments_count(article.id, 1)
     db.session.commit()
     # Обновляем JSON файл после создания комментария через API
-    save_all_json_files()
+    notify_data_changed(article_ids=[article.id], comment_ids=[comment.id])
     
     return jsonify(comment_to_dict(comment)), 201
 
+# Массовые операции: пачка проверяется, корректные элементы записываются одной транзакцией,
+# JSON файлы обновляются один раз на весь запрос
+def get_bulk_items():
+    """Элементы пачки из тела запроса (список или {"items": [...]}); при ошибке - (None, ответ)"""
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'error': 'Ожидается непустой список элементов'}), 400)
+    if len(items) > app.config['API_BULK_MAX_ITEMS']:
+        return None, (jsonify({'error': f"Не больше {app.config['API_BULK_MAX_ITEMS']} элементов за запрос"}), 413)
+    return items, None
+
+def bulk_item_error(item, fields, check_category=False):
+    """Ошибка типов полей элемента пачки или None: переданные поля из fields - непустые строки,
+    категория (check_category) - из VALID_CATEGORIES.
+
+    Проверяется до записи: иначе одно неверное значение сорвало бы общую транзакцию всей пачки.
+    """
+    invalid = [field for field in fields if field in item and not (isinstance(item[field], str) and item[field])]
+    if invalid:
+        return f"Поля должны быть непустыми строками: {', '.join(invalid)}"
+    if check_category and 'category' in item and item['category'] not in VALID_CATEGORIES:
+        return 'Неверная категория'
+    return None
+
+def bulk_response(results):
+    """Ответ массовой операции: результат по каждому элементу в порядке запроса"""
+    results.sort(key=lambda result: result['index'])
+    succeeded = sum(1 for result in results if 'id' in result)
+    return jsonify({
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'items': results
+    }), 200 if succeeded else 400
+
+@app.route('/api/articles/bulk', methods=['POST'])
+@token_required
+def api_bulk_articles(current_user):
+    """Массовое создание и обновление статей (защищено JWT).
+
+    Элемент без id создаёт статью (title и content обязательны), элемент с id обновляет
+    переданные поля своей статьи.
+    """
+    items, error = get_bulk_items()
+    if error:
+        return error
+
+    results = []
+    new_rows, new_indexes, updates, update_indexes = [], [], [], []
+    update_ids = {item['id'] for item in items if isinstance(item, dict) and type(item.get('id')) is int}
+    owners = dict(db.session.query(Article.id, Article.user_id).filter(Article.id.in_(update_ids)).all()) \
+        if update_ids else {}
+
+    for index, item in enumerate(items):
+        field_error = bulk_item_error(item, ('title', 'content'), check_category=True) if isinstance(item, dict) else None
+        if not isinstance(item, dict):
+            results.append({'index': index, 'error': 'Элемент должен быть объектом'})
+        elif 'id' in item:
+            if type(item['id']) is not int or item['id'] not in owners:
+                results.append({'index': index, 'error': 'Статья не найдена'})
+            elif owners[item['id']] != current_user.id:
+                results.append({'index': index, 'error': 'Недостаточно прав для редактирования статьи'})
+            elif field_error:
+                results.append({'index': index, 'error': field_error})
+            else:
+                values = {'id': item['id']}
+                if 'title' in item:
+                    values['title'] = item['title']
+                if 'content' in item:
+                    values['text'] = item['content']
+                    values['excerpt'] = make_excerpt(item['content'])
+                if 'category' in item:
+                    values['category'] = item['category']
+                updates.append(values)
+                update_indexes.append(index)
+        elif not item.get('title') or not item.get('content'):
+            results.append({'index': index, 'error': 'Название и содержание обязательны'})
+        elif field_error:
+            results.append({'index': index, 'error': field_error})
+        else:
+            new_rows.append({
+                'title': item['title'],
+                'text': item['content'],
+                'category': item.get('category', 'general'),
+                'user_id': current_user.id
+            })
+            new_indexes.append(index)
+
+    new_ids = []
+    if new_rows:
+        new_ids = db.session.scalars(
+            db.insert(Article).returning(Article.id, sort_by_parameter_order=True), new_rows
+        ).all()
+    for values in updates:
+        # Обновление по первичному ключу; элементы с разным набором полей нельзя объединить в один executemany
+        db.session.execute(db.update(Article), [values])
+    db.session.commit()
+
+    results += [{'index': index, 'id': article_id} for index, article_id in zip(new_indexes, new_ids)]
+    results += [{'index': index, 'id': values['id']} for index, values in zip(update_indexes, updates)]
+    if new_ids or updates:
+        notify_data_changed(article_ids=list(new_ids) + [values['id'] for values in updates])
+    return bulk_response(results)
+
+@app.route('/api/comment/bulk', methods=['POST'])
+@token_required
+def api_bulk_comments(current_user):
+    """Массовое создание и обновление комментариев (защищено JWT).
+
+    Элемент без id создаёт комментарий (text и article_id обязательны) от имени пользователя
+    из JWT, элемент с id обновляет text (и author_name, как PUT /api/comment/<id>).
+    """
+    items, error = get_bulk_items()
+    if error:
+        return error
+
+    results = []
+    new_rows, new_indexes, updates, update_indexes = [], [], [], []
+    dicts = [item for item in items if isinstance(item, dict)]
+    article_ids = {item['article_id'] for item in dicts if type(item.get('article_id')) is int}
+    existing_articles = set(db.session.scalars(
+        db.select(Article.id).where(Article.id.in_(article_ids))
+    ).all()) if article_ids else set()
+    comment_ids = {item['id'] for item in dicts if type(item.get('id')) is int}
+    comment_articles = dict(
+        db.session.query(Comment.id, Comment.article_id).filter(Comment.id.in_(comment_ids)).all()
+    ) if comment_ids else {}
+
+    for index, item in enumerate(items):
+        field_error = None
+        if isinstance(item, dict):
+            # author_name новых комментариев берётся из JWT, переданное значение не используется
+            field_error = bulk_item_error(item, ('text', 'author_name') if 'id' in item else ('text',))
+        if not isinstance(item, dict):
+            results.append({'index': index, 'error': 'Элемент должен быть объектом'})
+        elif 'id' in item:
+            if type(item['id']) is not int or item['id'] not in comment_articles:
+                results.append({'index': index, 'error': 'Комментарий не найден'})
+            elif not item.get('text'):
+                results.append({'index': index, 'error': 'Текст комментария обязателен'})
+            elif field_error:
+                results.append({'index': index, 'error': field_error})
+            else:
+                values = {'id': item['id'], 'text': item['text']}
+                if 'author_name' in item:
+                    values['author_name'] = item['author_name']
+                updates.append(values)
+                update_indexes.append(index)
+        elif not item.get('text') or not item.get('article_id'):
+            results.append({'index': index, 'error': 'Текст и ID статьи обязательны'})
+        elif field_error:
+            results.append({'index': index, 'error': field_error})
+        elif type(item['article_id']) is not int or item['article_id'] not in existing_articles:
+            results.append({'index': index, 'error': 'Статья не найдена'})
+        else:
+            new_rows.append({
+                'text': item['text'],
+                'author_name': current_user.name,
+                'article_id': item['article_id']
+            })
+            new_indexes.append(index)
+
+    new_ids = []
+    if new_rows:
+        new_ids = db.session.scalars(
+            db.insert(Comment).returning(Comment.id, sort_by_parameter_order=True), new_rows
+        ).all()
+        # Счётчики комментариев - одним UPDATE на каждую затронутую статью
+        added = {}
+        for row in new_rows:
+            added[row['article_id']] = added.get(row['article_id'], 0) + 1
+        db.session.execute(
+            Article.__table__.update()
+                .where(Article.__table__.c.id == bindparam('article_id'))
+                .values(comments_count=Article.__table__.c.comments_count + bindparam('added')),
+            [{'article_id': article_id, 'added': count} for article_id, count in added.items()]
+        )
+    for values in updates:
+        db.session.execute(db.update(Comment), [values])
+    db.session.commit()
+
+    results += [{'index': index, 'id': comment_id} for index, comment_id in zip(new_indexes, new_ids)]
+    results += [{'index': index, 'id': values['id']} for index, values in zip(update_indexes, updates)]
+    if new_ids or updates:
+        notify_data_changed(
+            article_ids={row['article_id'] for row in new_rows}
+                | {comment_articles[values['id']] for values in updates},
+            comment_ids=list(new_ids) + [values['id'] for values in updates]
+        )
+    return bulk_response(results)
+
 # Остальные API эндпоинты остаются без изменений
 @app.route('/api/articles', methods=['GET'])
+@conditional_get()
 def api_articles_list():
-    """Получить все статьи (работает с БД)"""
-    articles = Article.query.order_by(Article.created_date.desc()).all()
-    return jsonify([article_to_dict(article) for article in articles])
+    """Получить все статьи (работает с БД). Поддерживает ?limit=&cursor=, ?fields=, ?text_alias=0"""
+    return article_list_response()
 
 @app.route('/api/articles/<int:id>', methods=['GET'])
+@conditional_get(per_article=True)
 def api_article_detail(id):
-    """Получить статью по ID (работает с БД)"""
-    article = Article.query.get(id)
+    """Получить статью по ID (работает с БД). Поддерживает ?fields=, ?text_alias=0"""
+    try:
+        fields = get_article_fields()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    article = article_list_query(fields).filter(Article.id == id).first()
     if article:
-        return jsonify(article_to_dict(article))
+        return jsonify(article_to_dict(article, fields))
     return jsonify({'error': 'Статья не найдена'}), 404
 
 @app.route('/api/articles/category/<category>', methods=['GET'])
+@conditional_get()
 def api_articles_by_category(category):
-    """Получить статьи по категории (работает с БД)"""
-    valid_categories = ['technology', 'science', 'culture', 'sports', 'general']
-    if category not in valid_categories:
+    """Получить статьи по категории (работает с БД). Поддерживает ?limit=&cursor=, ?fields="""
+    if category not in VALID_CATEGORIES:
         return jsonify({'error': 'Неверная категория'}), 400
     
-    articles = Article.query.filter_by(category=category).order_by(Article.created_date.desc()).all()
-    return jsonify([article_to_dict(article) for article in articles])
+    return article_list_response(category)
 
 @app.route('/api/articles/sort/date', methods=['GET'])
+@conditional_get()
 def api_articles_sorted_by_date():
-    """Получить статьи, отсортированные по дате (работает с БД)"""
-    articles = Article.query.order_by(Article.created_date.desc()).all()
-    return jsonify([article_to_dict(article) for article in articles])
+    """Получить статьи, отсортированные по дате (работает с БД). Поддерживает ?limit=&cursor=, ?fields="""
+    return article_list_response()
+
+@app.route('/api/articles/<int:id>/comments', methods=['GET'])
+@conditional_get(per_article=True)
+def api_article_comments(id):
+    """Получить комментарии статьи, новые первыми (работает с БД). Поддерживает ?limit=&cursor="""
+    if db.session.query(Article.id).filter_by(id=id).first() is None:
+        return jsonify({'error': 'Статья не найдена'}), 404
+    return list_response(Comment.query.filter(Comment.article_id == id), Comment.date, Comment.id, comment_to_dict)
 
 @app.route('/api/comment', methods=['GET'])
+@conditional_get()
 def api_comments_list():
-    """Получить все комментарии (работает с БД)"""
-    comments = Comment.query.order_by(Comment.date.desc()).all()
-    return jsonify([comment_to_dict(comment) for comment in comments])
+    """Получить все комментарии (работает с БД). Поддерживает ?limit=&cursor="""
+    return list_response(Comment.query, Comment.date, Comment.id, comment_to_dict)
 
 @app.route('/api/comment/<int:id>', methods=['GET'])
+@conditional_get()
 def api_comment_detail(id):
     """Получить комментарий по ID (работает с БД)"""
     comment = Comment.query.get(id)
@@ -692,8 +2474,9 @@ def api_update_comment(id):
         comment.author_name = data['author_name']
     
     db.session.commit()
-    # Обновляем JSON файл после обновления комментария через API
-    save_all_json_files()
+    # Обновляем JSON файл после обновления комментария через API; версия статьи меняется,
+    # так как от неё зависит ETag списка её комментариев
+    notify_data_changed(article_ids=[comment.article_id], comment_ids=[id])
     
     return jsonify(comment_to_dict(comment))
 
@@ -705,10 +2488,12 @@ def api_delete_comment(id):
     if not comment:
         return jsonify({'error': 'Комментарий не найден'}), 404
     
+    article_id = comment.article_id
     db.session.delete(comment)
+    change_comments_count(article_id, -1)
     db.session.commit()
     # Обновляем JSON файл после удаления комментария через API
-    save_all_json_files()
+    notify_data_changed(article_ids=[article_id], comment_ids=[id])
     
     return jsonify({'message': 'Комментарий удален', 'comment': comment_to_dict(comment)})
 
@@ -716,20 +2501,109 @@ def api_delete_comment(id):
 @app.route('/api/json/articles', methods=['GET'])
 def api_json_articles_list():
     """Получить все статьи из JSON файла (для обратной совместимости)"""
-    articles_data = load_json_data(ARTICLES_JSON)
-    return jsonify(articles_data)
+    return add_snapshot_headers(json_file_response(ARTICLES_JSON))
 
 @app.route('/api/json/comments', methods=['GET'])
 def api_json_comments_list():
     """Получить все комментарии из JSON файла (для обратной совместимости)"""
-    comments_data = load_json_data(COMMENTS_JSON)
-    return jsonify(comments_data)
+    return add_snapshot_headers(json_file_response(COMMENTS_JSON))
+
+@app.route('/api/json/status', methods=['GET'])
+def api_json_status():
+    """Состояние фоновой выгрузки JSON файлов: последнее выгруженное поколение и наличие отложенных изменений"""
+    return jsonify(json_snapshot_worker.status())
+
+# Полнотекстовый поиск
+# Границы совпадений в snippet() - символы из области частного использования Unicode:
+# фрагмент сначала экранируется, и только потом они заменяются на <mark>
+SNIPPET_MARK_OPEN = '\ue000'
+SNIPPET_MARK_CLOSE = '\ue001'
+
+def snippet_html(snippet):
+    """Фрагмент текста для HTML: текст экранирован, совпадения обёрнуты в <mark>"""
+    return html.escape(snippet).replace(SNIPPET_MARK_OPEN, '<mark>').replace(SNIPPET_MARK_CLOSE, '</mark>')
+
+ARTICLE_SEARCH_SQL = """
+    SELECT article.id, article.title, article.category, article.created_date, article.user_id,
+           snippet(article_fts, -1, :mark_open, :mark_close, '...', 16) AS snippet,
+           bm25(article_fts, 10.0, 1.0) AS rank
+    FROM article_fts JOIN article ON article.id = article_fts.rowid
+    WHERE article_fts MATCH :query {category_filter}
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+
+COMMENT_SEARCH_SQL = """
+    SELECT comment.id, comment.article_id, comment.author_name, comment.date,
+           snippet(comment_fts, 0, :mark_open, :mark_close, '...', 16) AS snippet,
+           bm25(comment_fts) AS rank
+    FROM comment_fts JOIN comment ON comment.id = comment_fts.rowid
+    {category_join}
+    WHERE comment_fts MATCH :query {category_filter}
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+
+@app.route('/api/search', methods=['GET'])
+@conditional_get()
+def api_search():
+    """Полнотекстовый поиск по статьям (?type=article, по умолчанию) или комментариям (?type=comment).
+
+    Параметры: q - строка поиска, category - фильтр по категории статьи, limit и page - пагинация.
+    Результаты отсортированы по релевантности (bm25, совпадение в заголовке весит больше).
+    """
+    if not app.config['SEARCH_ENABLED']:
+        return jsonify({'error': 'Поиск недоступен'}), 503
+
+    query = fts_query(request.args.get('q', ''))
+    if not query:
+        return jsonify({'error': 'Параметр q обязателен'}), 400
+
+    search_type = request.args.get('type', 'article')
+    category = request.args.get('category')
+    if search_type not in ('article', 'comment') or (category and category not in VALID_CATEGORIES):
+        return jsonify({'error': 'Некорректные параметры поиска'}), 400
+    try:
+        limit = min(int(request.args.get('limit', 20)), app.config['SEARCH_MAX_LIMIT'])
+        page = int(request.args.get('page', 1))
+        if limit < 1 or page < 1:
+            raise ValueError()
+    except ValueError:
+        return jsonify({'error': 'Некорректные параметры пагинации'}), 400
+
+    params = {'query': query, 'limit': limit + 1, 'offset': (page - 1) * limit, 'category': category,
+              'mark_open': SNIPPET_MARK_OPEN, 'mark_close': SNIPPET_MARK_CLOSE}
+    if search_type == 'article':
+        sql = ARTICLE_SEARCH_SQL.format(category_filter='AND article.category = :category' if category else '')
+    else:
+        sql = COMMENT_SEARCH_SQL.format(
+            category_join='JOIN article ON article.id = comment.article_id' if category else '',
+            category_filter='AND article.category = :category' if category else ''
+        )
+    rows = db.session.execute(text(sql), params).mappings().all()
+
+    items = []
+    for row in rows[:limit]:
+        item = dict(row)
+        item['snippet'] = snippet_html(item['snippet'])
+        for field in ('created_date', 'date'):
+            if field in item:
+                item[field] = datetime.fromisoformat(item[field]).isoformat()
+        if 'user_id' in item:
+            item['author_id'] = item.pop('user_id')
+        items.append(item)
+
+    return jsonify({
+        'items': items,
+        'page': page,
+        'next_page': page + 1 if len(rows) > limit else None
+    })
 
 # Отладочные эндпоинты
 @app.route('/api/debug/articles')
 def debug_articles():
     """Эндпоинт для отладки - показывает статьи из базы данных"""
-    articles = Article.query.order_by(Article.created_date.desc()).all()
+    articles = article_list_query().order_by(Article.created_date.desc()).all()
     articles_data = []
     for article in articles:
         articles_data.append({
@@ -740,14 +2614,14 @@ def debug_articles():
             'author': article.author.name if article.author else 'Неизвестный автор',
             'author_id': article.user_id,
             'created_date': article.created_date.isoformat(),
-            'comments_count': len(article.comments)
+            'comments_count': article.comments_count
         })
     return jsonify(articles_data)
 
 @app.route('/api/debug/comments')
 def debug_comments():
     """Эндпоинт для отладки - показывает комментарии из базы данных"""
-    comments = Comment.query.order_by(Comment.date.desc()).all()
+    comments = Comment.query.options(joinedload(Comment.article)).order_by(Comment.date.desc()).all()
     comments_data = []
     for comment in comments:
         comments_data.append({
@@ -775,23 +2649,214 @@ def debug_users():
         })
     return jsonify(users_data)
 
+def explain_query_plan(query):
+    """План выполнения запроса SQLite (EXPLAIN QUERY PLAN)"""
+    statement = query.statement if hasattr(query, 'statement') else query
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)).all()
+    return [row[-1] for row in rows]
+
+@app.route('/api/debug/query-plans')
+def debug_query_plans():
+    """Эндпоинт для отладки - планы запросов списочных эндпоинтов.
+
+    В full_scans попадают запросы, в плане которых есть полный проход по таблице
+    без индекса или сортировка через временное B-дерево.
+    """
+    cursor = (datetime.utcnow(), 1)
+    limit = 20
+    queries = {
+        'api_articles_list': article_list_query().order_by(Article.created_date.desc(), Article.id.desc()),
+        'api_articles_list_page': keyset_query(article_list_query(), Article.created_date, Article.id, limit, cursor),
+        'api_articles_by_category': article_list_query().filter(Article.category == 'general')
+            .order_by(Article.created_date.desc(), Article.id.desc()),
+        'api_articles_by_category_page': keyset_query(
+            article_list_query().filter(Article.category == 'general'),
+            Article.created_date, Article.id, limit, cursor),
+        'api_comments_list': Comment.query.order_by(Comment.date.desc(), Comment.id.desc()),
+        'api_comments_list_page': keyset_query(Comment.query, Comment.date, Comment.id, limit, cursor),
+        'article_comments_page': keyset_query(
+            Comment.query.filter(Comment.article_id == 1), Comment.date, Comment.id, limit, cursor),
+        'refresh_token_lookup': RefreshToken.query.filter_by(token_hash=hash_refresh_token('-')),
+        'refresh_token_purge': db.select(RefreshToken.id).where(or_(
+            RefreshToken.expires_at < datetime.utcnow(), RefreshToken.revoked == True)).limit(limit),
+        'user_by_email': User.query.filter_by(email='test@example.com'),
+    }
+
+    plans = {name: explain_query_plan(query) for name, query in queries.items()}
+    full_scans = [
+        name for name, plan in plans.items()
+        if any((line.startswith('SCAN') and 'USING' not in line) or 'TEMP B-TREE' in line for line in plan)
+    ]
+    return jsonify({'plans': plans, 'full_scans': full_scans})
+
+@app.route('/api/debug/cache')
+def debug_cache():
+    """Эндпоинт для отладки - статистика попаданий в кэши"""
+    return jsonify({
+        'json_files': json_file_cache.stats(),
+        'jwt_users': user_exists_cache.stats(),
+        'latest_feed': latest_feed.stats(),
+        'shared_generations': cache_sync.stats(),
+        'pages': page_cache.stats()
+    })
+
+@app.route('/api/debug/metrics')
+def debug_metrics():
+    """Эндпоинт для отладки - метрики запросов в текстовом формате Prometheus"""
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Метрики выключены'}), 503
+    response = make_response(metrics.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
 @app.route('/api/debug/save-json', methods=['POST'])
 def debug_save_json():
     """Эндпоинт для принудительного сохранения JSON файлов (для отладки)"""
     save_all_json_files()
     return jsonify({'message': 'JSON файлы успешно обновлены'})
 
+# Полнотекстовый поиск: FTS5 индексы поверх таблиц article и comment (external content).
+# Индексы поддерживаются триггерами, поэтому синхронизированы с любой записью в таблицы,
+# в том числе с массовыми вставками и каскадным удалением комментариев.
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE article_fts USING fts5(
+        title, text, content='article', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )""",
+    """CREATE TRIGGER article_fts_insert AFTER INSERT ON article BEGIN
+        INSERT INTO article_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END""",
+    """CREATE TRIGGER article_fts_delete AFTER DELETE ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+    END""",
+    """CREATE TRIGGER article_fts_update AFTER UPDATE OF title, text ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO article_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END""",
+    """CREATE VIRTUAL TABLE comment_fts USING fts5(
+        text, content='comment', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )""",
+    """CREATE TRIGGER comment_fts_insert AFTER INSERT ON comment BEGIN
+        INSERT INTO comment_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER comment_fts_delete AFTER DELETE ON comment BEGIN
+        INSERT INTO comment_fts(comment_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER comment_fts_update AFTER UPDATE OF text ON comment BEGIN
+        INSERT INTO comment_fts(comment_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO comment_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+
+def create_search_index():
+    """Создание FTS5 индексов и триггеров, если их ещё нет, с индексацией существующих записей"""
+    if inspect(db.engine).has_table('article_fts'):
+        return
+    try:
+        with db.engine.begin() as connection:
+            for statement in SEARCH_INDEX_DDL:
+                connection.exec_driver_sql(statement)
+            connection.exec_driver_sql("INSERT INTO article_fts(article_fts) VALUES ('rebuild')")
+            connection.exec_driver_sql("INSERT INTO comment_fts(comment_fts) VALUES ('rebuild')")
+    except OperationalError:
+        app.logger.warning('SQLite собран без FTS5, полнотекстовый поиск отключён')
+        app.config['SEARCH_ENABLED'] = False
+
+def rebuild_search_index():
+    """Полная переиндексация статей и комментариев"""
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO article_fts(article_fts) VALUES ('rebuild')")
+        connection.exec_driver_sql("INSERT INTO comment_fts(comment_fts) VALUES ('rebuild')")
+
+def fts_query(q):
+    """Преобразование пользовательской строки в запрос FTS5: все слова обязательны, поиск по префиксу.
+
+    Слова берутся в кавычки, поэтому операторы и спецсимволы FTS5 во вводе не ломают запрос.
+    Однобуквенные слова ищутся целиком: префикс из одной буквы раскрывается в слишком много слов.
+    """
+    words = re.findall(r'\w+', q)
+    return ' '.join(f'"{word}"*' if len(word) > 1 else f'"{word}"' for word in words)
+
+# Обновление схемы существующих баз данных (db.create_all() не добавляет колонки в существующие таблицы)
+def upgrade_schema():
+    """Добавление недостающих колонок в базу, созданную предыдущими версиями приложения"""
+    # Первой: её обновляет каждый коммит записи, в том числе пересчёты ниже
+    if 'modified_at' not in {column['name'] for column in inspect(db.engine).get_columns('cache_generation')}:
+        db.session.execute(text('ALTER TABLE cache_generation ADD COLUMN modified_at INTEGER NOT NULL DEFAULT 0'))
+        db.session.execute(text('UPDATE cache_generation SET modified_at = :now'), {'now': int(time.time())})
+        db.session.commit()
+    article_columns = {column['name'] for column in inspect(db.engine).get_columns('article')}
+    if 'comments_count' not in article_columns:
+        db.session.execute(text('ALTER TABLE article ADD COLUMN comments_count INTEGER NOT NULL DEFAULT 0'))
+        db.session.commit()
+        recount_comments()
+    if 'excerpt' not in article_columns:
+        db.session.execute(text("ALTER TABLE article ADD COLUMN excerpt VARCHAR(201) NOT NULL DEFAULT ''"))
+        db.session.commit()
+        backfill_excerpts()
+
+    # Refresh токены раньше хранились целиком в колонке token - пересоздаём таблицу с хэшами
+    refresh_token_columns = {column['name'] for column in inspect(db.engine).get_columns('refresh_token')}
+    if 'token_hash' not in refresh_token_columns:
+        with db.engine.begin() as connection:
+            rows = connection.exec_driver_sql(
+                'SELECT id, token, user_id, created_at, expires_at, revoked FROM refresh_token'
+            ).all()
+            connection.exec_driver_sql('DROP TABLE refresh_token')
+            RefreshToken.__table__.create(connection)
+            if rows:
+                connection.exec_driver_sql(
+                    'INSERT INTO refresh_token (id, token_hash, user_id, created_at, expires_at, revoked) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(row[0], hash_refresh_token(row[1])) + tuple(row[2:]) for row in rows]
+                )
+
+    # Индексы, объявленные в моделях, но отсутствующие в базе
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    create_search_index()
+
+@app.cli.command('recount-comments')
+def recount_comments_command():
+    """Пересчитать счётчики комментариев у всех статей"""
+    recount_comments()
+    click.echo('Счётчики комментариев пересчитаны')
+
+@app.cli.command('backfill-excerpts')
+def backfill_excerpts_command():
+    """Пересчитать превью (excerpt) всех статей"""
+    backfill_excerpts()
+    click.echo('Превью статей пересчитаны')
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Переиндексировать статьи и комментарии для полнотекстового поиска"""
+    rebuild_search_index()
+    click.echo('Поисковый индекс перестроен')
+
+@app.cli.command('purge-refresh-tokens')
+def purge_refresh_tokens_command():
+    """Удалить истёкшие и отозванные refresh токены"""
+    click.echo(f'Удалено refresh токенов: {purge_refresh_tokens()}')
+
 # Инициализация базы данных и JSON файлов
 with app.app_context():
     db.create_all()
+    upgrade_schema()
+    cache_sync.load()
     init_json_files()
+    latest_feed.rebuild()
     
     # Создаем тестового пользователя, если его нет
     if not User.query.filter_by(email='test@example.com').first():
         test_user = User(
             name='Test User',
             email='test@example.com',
-            hashed_password=generate_password_hash('testpassword')
+            hashed_password=hash_password('testpassword')
         )
         db.session.add(test_user)
         db.session.commit()
@@ -0,0 +1,302 @@
+"""ASGI приложение с асинхронным путём чтения API.
+
+    uvicorn asgi:application
+
+GET запросы списков и деталей статей и комментариев (в том числе комментариев статьи) и
+/api/json/* обслуживаются корутинами: база читается через SQLAlchemy asyncio и драйвер aiosqlite,
+поэтому клиенты, ожидающие ответа базы (или получающие 304 без обращения к ней), не занимают
+потоки. Ответы совпадают с app.py:
+те же параметры (?limit=&cursor=, ?fields=, ?text_alias=, ?stream=1), ETag / Last-Modified и
+304, те же ошибки. Остальные маршруты и методы передаются Flask приложению, которое выполняется
+в пуле из ASGI_SYNC_WORKERS потоков.
+
+Асинхронный путь работает только с файловой базой SQLite; с другой базой все запросы
+обслуживает Flask приложение. Зависимости: aiosqlite, greenlet и a2wsgi (requirements.txt).
+"""
+import asyncio
+import re
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.wrappers import Request
+
+import app as news_app
+from app import app, db, metrics, Article, Comment
+
+
+def create_engine():
+    """Асинхронный движок на той же базе, что и у Flask приложения (None, если база не файловая SQLite)"""
+    with app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    options = {}
+    if app.config['SQLITE_PROFILE'] == 'production':
+        options.update(app.config['SQLITE_POOL_OPTIONS'])
+    engine = create_async_engine(url.set(drivername='sqlite+aiosqlite'), **options)
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        news_app.set_sqlite_pragmas(dbapi_connection)
+
+    return engine
+
+
+engine = create_engine()
+Session = async_sessionmaker(engine, expire_on_commit=False) if engine is not None else None
+flask_application = WSGIMiddleware(app, workers=app.config['ASGI_SYNC_WORKERS'])
+
+
+def jsonify(payload, status=200):
+    """Ответ как у flask.jsonify (те же байты и заголовки)"""
+    response = app.json.response(payload)
+    response.status_code = status
+    return response
+
+
+class JsonStream:
+    """Потоковый JSON массив (?stream=1): строки читаются из БД пачками по API_STREAM_BATCH_SIZE"""
+
+    def __init__(self, session, query, to_dict):
+        self.session = session
+        self.query = query
+        self.to_dict = to_dict
+        # Тело-итератор: ответ потоковый, без Content-Length
+        self.response = app.response_class(iter(()), mimetype=app.json.mimetype)
+
+    async def chunks(self):
+        writer = news_app.JsonArrayWriter()
+        yield writer.start()
+        result = await self.session.stream_scalars(
+            self.query.execution_options(yield_per=app.config['API_STREAM_BATCH_SIZE'])
+        )
+        async for item in result:
+            chunk = writer.add(self.to_dict(item))
+            if chunk:
+                yield chunk
+        yield writer.finish()
+
+
+async def list_response(session, request, query, date_column, id_column, to_dict):
+    """Асинхронный аналог list_response из app.py"""
+    try:
+        limit, cursor = news_app.parse_page_args(request.args.get('limit'), request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Некорректные параметры пагинации'}, 400)
+
+    if limit is None:
+        query = query.order_by(date_column.desc(), id_column.desc())
+        if request.args.get('stream') in ('1', 'true'):
+            return JsonStream(session, query, to_dict)
+        return jsonify([to_dict(item) for item in (await session.scalars(query)).all()])
+
+    items = (await session.scalars(news_app.keyset_query(query, date_column, id_column, limit, cursor))).all()
+    items, next_cursor = news_app.split_keyset_page(items, date_column, limit)
+    return jsonify({
+        'items': [to_dict(item) for item in items],
+        'next_cursor': next_cursor
+    })
+
+
+async def article_list_response(session, request, query_filter=None):
+    """Асинхронный аналог article_list_response из app.py"""
+    try:
+        fields = news_app.parse_article_fields(request.args.get('fields'), request.args.get('text_alias'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+    query = db.select(Article).options(*news_app.article_list_options(fields))
+    if query_filter is not None:
+        query = query.where(query_filter)
+    return await list_response(session, request, query, Article.created_date, Article.id,
+                               lambda article: news_app.article_to_dict(article, fields))
+
+
+async def api_articles_list(session, request):
+    return await article_list_response(session, request)
+
+
+async def api_article_detail(session, request, id):
+    try:
+        fields = news_app.parse_article_fields(request.args.get('fields'), request.args.get('text_alias'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+    query = db.select(Article).options(*news_app.article_list_options(fields)).where(Article.id == id).limit(1)
+    article = (await session.scalars(query)).first()
+    if article:
+        return jsonify(news_app.article_to_dict(article, fields))
+    return jsonify({'error': 'Статья не найдена'}, 404)
+
+
+async def api_articles_by_category(session, request, category):
+    if category not in news_app.VALID_CATEGORIES:
+        return jsonify({'error': 'Неверная категория'}, 400)
+    return await article_list_response(session, request, Article.category == category)
+
+
+async def api_article_comments(session, request, id):
+    if (await session.scalars(db.select(Article.id).where(Article.id == id))).first() is None:
+        return jsonify({'error': 'Статья не найдена'}, 404)
+    return await list_response(session, request, db.select(Comment).where(Comment.article_id == id),
+                               Comment.date, Comment.id, news_app.comment_to_dict)
+
+
+async def api_comments_list(session, request):
+    return await list_response(session, request, db.select(Comment), Comment.date, Comment.id,
+                               news_app.comment_to_dict)
+
+
+async def api_comment_detail(session, request, id):
+    comment = await session.get(Comment, id)
+    if comment:
+        return jsonify(news_app.comment_to_dict(comment))
+    return jsonify({'error': 'Комментарий не найден'}, 404)
+
+
+async def json_file(filename):
+    # Промах кэша читает и сериализует файл целиком - в пуле потоков, а не в цикле событий
+    return await asyncio.to_thread(
+        lambda: news_app.add_snapshot_headers(news_app.json_file_response(filename))
+    )
+
+
+async def api_json_articles_list(session, request):
+    return await json_file(news_app.ARTICLES_JSON)
+
+
+async def api_json_comments_list(session, request):
+    return await json_file(news_app.COMMENTS_JSON)
+
+
+async def api_json_status(session, request):
+    return jsonify(news_app.json_snapshot_worker.status())
+
+
+# (шаблон пути, обработчик, условный GET: None, 'all' или 'article'); имена обработчиков
+# совпадают с эндпоинтами Flask, поэтому метрики обоих путей сводятся в одни ряды
+ROUTES = [
+    (re.compile(r'/api/articles'), api_articles_list, 'all'),
+    (re.compile(r'/api/articles/(?P<id>\d+)'), api_article_detail, 'article'),
+    (re.compile(r'/api/articles/category/(?P<category>[^/]+)'), api_articles_by_category, 'all'),
+    (re.compile(r'/api/articles/(?P<id>\d+)/comments'), api_article_comments, 'article'),
+    (re.compile(r'/api/comment'), api_comments_list, 'all'),
+    (re.compile(r'/api/comment/(?P<id>\d+)'), api_comment_detail, 'all'),
+    (re.compile(r'/api/json/articles'), api_json_articles_list, None),
+    (re.compile(r'/api/json/comments'), api_json_comments_list, None),
+    (re.compile(r'/api/json/status'), api_json_status, None),
+]
+
+
+def match_route(path):
+    for pattern, handler, conditional in ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            kwargs = {name: int(value) if name == 'id' else value for name, value in match.groupdict().items()}
+            return handler, conditional, kwargs
+    return None
+
+
+def wsgi_environ(scope):
+    """WSGI окружение из ASGI scope: запрос разбирается тем же werkzeug, что и во Flask"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def send_start(send, response, environ):
+    status = response.status_code
+    headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+               for name, value in response.get_wsgi_headers(environ).to_wsgi_list()]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+
+
+def sync_shared_caches():
+    with app.app_context():
+        news_app.cache_sync.check()
+
+
+async def handle(scope, receive, send, handler, conditional, kwargs):
+    """Асинхронный обработчик с условным GET (как conditional_get в app.py) и метриками"""
+    environ = wsgi_environ(scope)
+    request = Request(environ)
+    record = None
+    if app.config['METRICS_ENABLED']:
+        metrics.start_request()
+        record = metrics.current()
+    try:
+        # Как before_request во Flask: сверка поколений cache_generation (в пуле потоков)
+        if news_app.cache_sync.due():
+            await asyncio.to_thread(sync_shared_caches)
+        etag = None
+        if conditional is not None:
+            etag, last_modified = news_app.data_version.current(kwargs['id'] if conditional == 'article' else None)
+            if news_app.is_not_modified(etag, last_modified, request.if_none_match, request.if_modified_since):
+                response = app.response_class('', 304)
+                response.set_etag(etag)
+                response.last_modified = last_modified
+                metrics.track_response(response)
+                await send_start(send, response, environ)
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+
+        async with Session() as session:
+            result = await handler(session, request, **kwargs)
+            response = result.response if isinstance(result, JsonStream) else result
+            if etag is not None and response.status_code == 200:
+                response.set_etag(etag)
+                response.last_modified = last_modified
+
+            if isinstance(result, JsonStream):
+                if record is not None:
+                    record['status'] = response.status_code
+                await send_start(send, response, environ)
+                async for chunk in result.chunks():
+                    chunk = chunk.encode('utf-8')
+                    if record is not None:
+                        record['size'] += len(chunk)
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await send({'type': 'http.response.body', 'body': b''})
+            else:
+                metrics.track_response(response)
+                await send_start(send, response, environ)
+                await send({'type': 'http.response.body', 'body': b''.join(response.get_app_iter(environ))})
+    finally:
+        metrics.finish_request(handler.__name__, 'GET')
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if engine is not None:
+                await engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI приложение: асинхронные GET эндпоинты чтения, всё остальное - Flask"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http' and scope['method'] == 'GET' and engine is not None:
+        route = match_route(scope['path'])
+        if route is not None:
+            return await handle(scope, receive, send, *route)
+    return await flask_application(scope, receive, send)
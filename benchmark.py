@@ -0,0 +1,721 @@
+"""Нагрузочные бенчмарки приложения.
+
+Приложение запускается в этом же процессе на локальном WSGI сервере поверх временной базы
+и временных JSON файлов, поэтому рабочая news_blog.db не затрагивается.
+
+    python benchmark.py login --duration 5
+    python benchmark.py search --articles 100000
+    python benchmark.py suite --sizes 1000 100000 --save-baseline benchmark_baseline.json
+    python benchmark.py suite --sizes 1000 100000 --baseline benchmark_baseline.json
+    python benchmark.py sqlite --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Окружение до подстановки временных путей: с ним запускаются дочерние процессы suite
+INHERITED_ENV = dict(os.environ)
+TMP_DIR = tempfile.mkdtemp(prefix='news_blog_bench_')
+# Пути из окружения не используются: бенчмарк наполняет базу сотнями тысяч строк
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'news_blog.db')
+os.environ['ARTICLES_JSON'] = os.path.join(TMP_DIR, 'articles.json')
+os.environ['COMMENTS_JSON'] = os.path.join(TMP_DIR, 'comments.json')
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import app as news_app
+from app import app, db, User, Article, Comment
+
+CATEGORIES = ['technology', 'science', 'culture', 'sports', 'general']
+
+# Бенчмарки измеряют сами эндпоинты, а не отказы 429
+app.config['RATE_LIMIT_ENABLED'] = False
+
+
+def print_section(title):
+    """Печатает заголовок раздела"""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70)
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку значений"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def make_vocabulary(size, seed=42):
+    """Словарь псевдослов из слогов: реалистичное распределение для полнотекстового поиска"""
+    rng = random.Random(seed)
+    syllables = ['ка', 'ро', 'ми', 'ну', 'ле', 'ста', 'пра', 'ви', 'то', 'зе', 'ры', 'до', 'ша', 'ки', 'лю']
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed_articles(count, author_email='test@example.com', vocabulary=None, batch_size=5000):
+    """Наполнение базы статьями тестового пользователя (до count статей).
+
+    С vocabulary текст статей составляется из случайных слов словаря (распределение Ципфа),
+    иначе используется одинаковый шаблонный текст.
+    """
+    rng = random.Random(count)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))] if vocabulary else None
+
+    def article_text(i):
+        if not vocabulary:
+            return f'Текст статьи номер {i}. ' * 20
+        return ' '.join(rng.choices(vocabulary, weights, k=80))
+
+    with app.app_context():
+        author = User.query.filter_by(email=author_email).first()
+        existing = Article.query.count()
+        for start in range(existing, count, batch_size):
+            rows = [
+                {
+                    'title': f'Статья {i} ' + (' '.join(rng.choices(vocabulary, weights, k=3)) if vocabulary else ''),
+                    'text': article_text(i),
+                    'category': CATEGORIES[i % len(CATEGORIES)],
+                    'user_id': author.id
+                }
+                for i in range(start, min(start + batch_size, count))
+            ]
+            db.session.execute(db.insert(Article), rows)
+            db.session.commit()
+    # Статьи добавлены в обход эндпоинтов - лента последних статей собирается заново
+    news_app.latest_feed.invalidate()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Обработчик запросов без записи каждого запроса в лог"""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class LocalServer:
+    """Приложение на локальном многопоточном WSGI сервере"""
+
+    def __init__(self):
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+    def request(self, method, path, body=None, headers=None):
+        """HTTP запрос к серверу, возвращает (статус, тело)"""
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        return response.status, data
+
+
+def run_load(scenarios, duration):
+    """Параллельная нагрузка.
+
+    scenarios - список (имя, число потоков, функция запроса). Функция возвращает HTTP статус.
+    Результат: по каждому сценарию число запросов, статусы, пропускная способность и перцентили.
+    """
+    stop_at = time.perf_counter() + duration
+    results = {name: {'latencies': [], 'statuses': {}} for name, _, _ in scenarios}
+    lock = threading.Lock()
+
+    def worker(name, func):
+        latencies = []
+        statuses = {}
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            status = func()
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+        with lock:
+            results[name]['latencies'].extend(latencies)
+            for status, count in statuses.items():
+                results[name]['statuses'][status] = results[name]['statuses'].get(status, 0) + count
+
+    threads = [
+        threading.Thread(target=worker, args=(name, func))
+        for name, count, func in scenarios
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = {}
+    for name, result in results.items():
+        latencies = result['latencies']
+        summary[name] = {
+            'requests': len(latencies),
+            'statuses': {str(status): count for status, count in sorted(result['statuses'].items())},
+            'throughput_rps': round(len(latencies) / duration, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        }
+    return summary
+
+
+def print_summary(summary):
+    for name, stats in summary.items():
+        print(f"  {name:<28} {stats['throughput_rps']:>9} rps   "
+              f"p50 {stats['p50_ms']:>8} ms   p95 {stats['p95_ms']:>8} ms   "
+              f"p99 {stats['p99_ms']:>8} ms   статусы {stats['statuses']}")
+
+
+def bench_login(args):
+    """Пропускная способность логинов и чтения статей при одновременной волне логинов"""
+    seed_articles(args.articles)
+    login_body = {'email': 'test@example.com', 'password': 'testpassword'}
+    results = {}
+
+    for workers in (0, args.hash_workers):
+        app.config['PASSWORD_HASH_WORKERS'] = workers
+        app.config['PASSWORD_HASH_MAX_PENDING'] = args.max_pending
+        news_app.password_hasher = news_app.PasswordHasher()
+        label = 'inline' if workers == 0 else f'pool({workers}), очередь {args.max_pending}'
+        print_section(f"ЛОГИН + ЧТЕНИЕ: хэширование {label}")
+
+        with LocalServer() as server:
+            summary = run_load([
+                ('POST /api/auth/login', args.login_threads,
+                 lambda: server.request('POST', '/api/auth/login', login_body)[0]),
+                ('GET /api/articles?limit=20', args.read_threads,
+                 lambda: server.request('GET', '/api/articles?limit=20')[0]),
+            ], args.duration)
+        print_summary(summary)
+        results[label] = summary
+    return results
+
+
+def time_call(func, repeat):
+    """Латентности повторных вызовов func в миллисекундах: (p50, p95)"""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return round(percentile(latencies, 0.50) * 1000, 2), round(percentile(latencies, 0.95) * 1000, 2)
+
+
+def bench_search(args):
+    """Поиск через FTS5 (/api/search) в сравнении с LIKE по заголовку и тексту"""
+    vocabulary = make_vocabulary(5000)
+    print_section(f"ПОИСК: наполнение базы до {args.articles} статей")
+    started = time.perf_counter()
+    seed_articles(args.articles, vocabulary=vocabulary)
+    print(f"  готово за {time.perf_counter() - started:.1f} с")
+
+    client = app.test_client()
+    like_sql = db.text(
+        'SELECT id, title FROM article WHERE title LIKE :pattern OR text LIKE :pattern '
+        'ORDER BY created_date DESC LIMIT 20'
+    )
+    like_count_sql = db.text('SELECT count(*) FROM article WHERE title LIKE :pattern OR text LIKE :pattern')
+    # Частое, среднее и редкое слово словаря
+    words = {'частое': vocabulary[0], 'среднее': vocabulary[200], 'редкое': vocabulary[-1]}
+    results = {}
+
+    print_section("ПОИСК: FTS5 против LIKE (p50 / p95, мс)")
+    with app.app_context():
+        for label, word in words.items():
+            pattern = f'%{word}%'
+            matches = db.session.execute(like_count_sql, {'pattern': pattern}).scalar()
+            fts = time_call(lambda: client.get('/api/search', query_string={'q': word, 'limit': 20}), args.repeat)
+            fts_category = time_call(
+                lambda: client.get('/api/search', query_string={'q': word, 'limit': 20, 'category': 'science'}),
+                args.repeat)
+            like_page = time_call(lambda: db.session.execute(like_sql, {'pattern': pattern}).all(), args.repeat)
+            like_count = time_call(lambda: db.session.execute(like_count_sql, {'pattern': pattern}).scalar(),
+                                   args.repeat)
+            results[label] = {
+                'word': word, 'matches': matches,
+                'fts_page': fts, 'fts_page_category': fts_category,
+                'like_page': like_page, 'like_count': like_count
+            }
+            print(f"  {label:<8} ({matches} совпадений): FTS стр. {fts}, FTS+категория {fts_category}, "
+                  f"LIKE стр. {like_page}, LIKE все {like_count}")
+    return results
+
+
+def seed_comments(count, batch_size=5000):
+    """Наполнение базы комментариями (до count): по кругу ко всем статьям, к первой статье - 200 сверху.
+
+    Счётчики comments_count пересчитываются по таблице комментариев.
+    """
+    with app.app_context():
+        article_ids = db.session.scalars(db.select(Article.id).order_by(Article.id)).all()
+        targets = [article_ids[0]] * 200 + article_ids
+        existing = Comment.query.count()
+        for start in range(existing, count, batch_size):
+            rows = [
+                {
+                    'text': f'Комментарий номер {i}',
+                    'author_name': f'Читатель {i % 100}',
+                    'article_id': targets[i % len(targets)]
+                }
+                for i in range(start, min(start + batch_size, count))
+            ]
+            db.session.execute(db.insert(Comment), rows)
+            db.session.commit()
+        news_app.recount_comments()
+    news_app.latest_feed.invalidate()
+
+
+class SuiteContext:
+    """Клиенты, токены и вспомогательные записи для сценариев suite.
+
+    Подготовка (создание удаляемых статей, refresh токенов, вход в сессию) выполняется
+    вне замера времени.
+    """
+
+    def __init__(self, articles):
+        self.client = app.test_client()
+        self.counter = 0
+        with app.app_context():
+            self.user = User.query.filter_by(email='test@example.com').first()
+            self.user_id = self.user.id
+            self.access_token = news_app.create_access_token(self.user)
+            self.comment_id = db.session.scalars(db.select(Comment.id).order_by(Comment.id.desc())).first()
+        self.hot_article_id = 1
+        self.article_id = max(1, articles // 2)
+        self.web = self.web_client()
+
+    @property
+    def auth(self):
+        return {'Authorization': f'Bearer {self.access_token}'}
+
+    def unique(self):
+        self.counter += 1
+        return self.counter
+
+    def web_client(self):
+        """Тестовый клиент с сессией тестового пользователя (без проверки пароля)"""
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(self.user_id)
+            session['_fresh'] = True
+        return client
+
+    def new_article(self):
+        with app.app_context():
+            article = Article(title='Удаляемая статья', text='Текст', category='general', user_id=self.user_id)
+            db.session.add(article)
+            db.session.commit()
+            return article.id
+
+    def new_comment(self):
+        with app.app_context():
+            comment = Comment(text='Удаляемый комментарий', author_name='Бенчмарк', article_id=self.article_id)
+            db.session.add(comment)
+            news_app.change_comments_count(self.article_id, 1)
+            db.session.commit()
+            return comment.id
+
+    def new_refresh_token(self):
+        with app.app_context():
+            return news_app.create_refresh_token(self.user_id)
+
+
+def suite_routes(ctx):
+    """Сценарии suite: (имя, ожидаемый статус, подготовка).
+
+    Подготовка получает номер итерации и возвращает функцию запроса без аргументов,
+    время выполнения которой и замеряется.
+    """
+    client, web = ctx.client, ctx.web
+    article, hot, comment = ctx.article_id, ctx.hot_article_id, ctx.comment_id
+    login_form = {'email': 'test@example.com', 'password': 'testpassword'}
+    login_json = {'email': 'test@example.com', 'password': 'testpassword'}
+
+    def get(path, http_client=client, **kwargs):
+        return lambda i: lambda: http_client.get(path, **kwargs)
+
+    def json_sync(i):
+        def request():
+            response = client.post('/api/articles', headers=ctx.auth,
+                                   json={'title': f'Синхронизация {i}', 'content': 'Текст'})
+            news_app.flush_json_snapshots(60)
+            return response
+        return request
+
+    def logout(i):
+        http_client = ctx.web_client()
+        return lambda: http_client.get('/logout')
+
+    def api_logout(i):
+        refresh_token = ctx.new_refresh_token()
+        return lambda: client.post('/api/auth/logout', headers=ctx.auth, json={'refresh_token': refresh_token})
+
+    def register(i):
+        email = f'bench{ctx.unique()}@example.com'
+        return lambda: client.post('/register', data={'name': 'Бенчмарк', 'email': email, 'password': 'secret'})
+
+    def delete_article(i):
+        article_id = ctx.new_article()
+        return lambda: web.get(f'/delete-article/{article_id}')
+
+    def api_delete_article(i):
+        article_id = ctx.new_article()
+        return lambda: client.delete(f'/api/articles/{article_id}', headers=ctx.auth)
+
+    def api_delete_comment(i):
+        comment_id = ctx.new_comment()
+        return lambda: client.delete(f'/api/comment/{comment_id}')
+
+    refresh_token = ctx.new_refresh_token()
+    return [
+        # Страницы
+        ('GET /', 200, get('/')),
+        ('GET /about', 200, get('/about')),
+        ('GET /contact', 200, get('/contact')),
+        ('GET /feedback', 200, get('/feedback')),
+        ('GET /news/<id>', 200, get(f'/news/{hot}')),
+        ('GET /articles', 200, get('/articles')),
+        ('GET /articles/<category>', 200, get('/articles/science')),
+        ('GET /register', 200, get('/register')),
+        ('GET /login', 200, get('/login')),
+        ('GET /create-article', 200, get('/create-article', web)),
+        ('GET /edit-article/<id>', 200, get(f'/edit-article/{article}', web)),
+        # Чтение через API
+        ('GET /api/articles', 200, get('/api/articles')),
+        ('GET /api/articles?limit=20', 200, get('/api/articles?limit=20')),
+        ('GET /api/articles?stream=1', 200, get('/api/articles?stream=1')),
+        ('GET /api/articles?fields=id,title&limit=20', 200, get('/api/articles?fields=id,title&limit=20')),
+        ('GET /api/articles/<id>', 200, get(f'/api/articles/{article}')),
+        ('GET /api/articles/category/<category>', 200, get('/api/articles/category/science')),
+        ('GET /api/articles/sort/date', 200, get('/api/articles/sort/date')),
+        ('GET /api/comment', 200, get('/api/comment')),
+        ('GET /api/comment?limit=20', 200, get('/api/comment?limit=20')),
+        ('GET /api/comment/<id>', 200, get(f'/api/comment/{comment}')),
+        ('GET /api/articles/<id>/comments?limit=20', 200, get(f'/api/articles/{hot}/comments?limit=20')),
+        ('GET /api/search', 200, get('/api/search?q=статья&limit=20')),
+        # JSON файлы
+        ('GET /api/json/articles', 200, get('/api/json/articles')),
+        ('GET /api/json/comments', 200, get('/api/json/comments')),
+        ('GET /api/json/status', 200, get('/api/json/status')),
+        # JWT
+        ('POST /api/auth/login', 200, lambda i: lambda: client.post('/api/auth/login', json=login_json)),
+        ('POST /api/auth/refresh', 200,
+         lambda i: lambda: client.post('/api/auth/refresh', json={'refresh_token': refresh_token})),
+        ('GET /api/auth/me', 200, lambda i: lambda: client.get('/api/auth/me', headers=ctx.auth)),
+        ('GET /api/auth/me без токена', 401, get('/api/auth/me')),
+        ('GET /api/auth/me с неверным токеном', 401,
+         get('/api/auth/me', headers={'Authorization': 'Bearer invalid.token.here'})),
+        ('POST /api/auth/logout', 200, api_logout),
+        # Запись через страницы
+        ('POST /login', 302, lambda i: lambda: client.post('/login', data=login_form)),
+        ('POST /register', 302, register),
+        ('GET /logout', 302, logout),
+        ('POST /feedback', 302, lambda i: lambda: client.post('/feedback', data={
+            'name': 'Бенчмарк', 'email': 'bench@example.com', 'message': 'Сообщение'})),
+        ('POST /news/<id>', 302, lambda i: lambda: client.post(f'/news/{article}', data={
+            'author_name': 'Бенчмарк', 'comment_text': f'Комментарий {i}'})),
+        ('POST /create-article', 302, lambda i: lambda: web.post('/create-article', data={
+            'title': f'Статья со страницы {i}', 'text': 'Текст', 'category': 'science'})),
+        ('POST /edit-article/<id>', 302, lambda i: lambda: web.post(f'/edit-article/{article}', data={
+            'title': f'Отредактировано {i}', 'text': 'Текст', 'category': 'science'})),
+        ('GET /delete-article/<id>', 302, delete_article),
+        # Запись через API
+        ('POST /api/articles', 201, lambda i: lambda: client.post('/api/articles', headers=ctx.auth, json={
+            'title': f'Статья из API {i}', 'content': 'Текст', 'category': 'technology'})),
+        ('PUT /api/articles/<id>', 200, lambda i: lambda: client.put(f'/api/articles/{article}', headers=ctx.auth,
+                                                                      json={'title': f'Обновлено {i}'})),
+        ('DELETE /api/articles/<id>', 200, api_delete_article),
+        ('POST /api/articles/bulk', 200, lambda i: lambda: client.post('/api/articles/bulk', headers=ctx.auth, json=[
+            {'title': f'Пачка {i}-{n}', 'content': 'Текст'} for n in range(50)])),
+        ('POST /api/comment', 201, lambda i: lambda: client.post('/api/comment', headers=ctx.auth, json={
+            'article_id': article, 'text': f'Комментарий из API {i}'})),
+        ('PUT /api/comment/<id>', 200, lambda i: lambda: client.put(f'/api/comment/{comment}', json={
+            'text': f'Обновлено {i}'})),
+        ('DELETE /api/comment/<id>', 200, api_delete_comment),
+        ('POST /api/comment/bulk', 200, lambda i: lambda: client.post('/api/comment/bulk', headers=ctx.auth, json=[
+            {'article_id': article, 'text': f'Пачка {i}-{n}'} for n in range(50)])),
+        # Синхронизация JSON: запись и дописывание изменений в файлы
+        ('JSON sync: POST /api/articles + flush', 201, json_sync),
+        # Отладка
+        ('GET /api/debug/articles', 200, get('/api/debug/articles')),
+        ('GET /api/debug/comments', 200, get('/api/debug/comments')),
+        ('GET /api/debug/users', 200, get('/api/debug/users')),
+        ('GET /api/debug/query-plans', 200, get('/api/debug/query-plans')),
+        ('GET /api/debug/cache', 200, get('/api/debug/cache')),
+        ('GET /api/debug/metrics', 200, get('/api/debug/metrics')),
+        ('POST /api/debug/save-json', 200, lambda i: lambda: client.post('/api/debug/save-json')),
+    ]
+
+
+def measure_route(prepare, expected_status, requests, max_seconds, warmup):
+    """Последовательные запросы одного сценария.
+
+    Выполняет до requests замеров, но не дольше max_seconds суммарного времени (минимум 3 замера).
+    """
+    for i in range(warmup):
+        prepare(-1 - i)()
+    latencies = []
+    statuses = {}
+    for i in range(requests):
+        request = prepare(i)
+        started = time.perf_counter()
+        response = request()
+        response.get_data()
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        response.close()
+        if len(latencies) >= 3 and sum(latencies) > max_seconds:
+            break
+    total = sum(latencies)
+    return {
+        'requests': len(latencies),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'unexpected': sum(count for status, count in statuses.items() if status != expected_status),
+        'throughput_rps': round(len(latencies) / total, 1) if total else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def run_suite_size(args):
+    """Все сценарии suite на базе из args.articles статей (в текущем процессе)"""
+    print_section(f"SUITE: наполнение базы до {args.articles} статей")
+    started = time.perf_counter()
+    seed_articles(args.articles)
+    seed_comments(args.comments if args.comments is not None else max(1000, args.articles // 4))
+    with app.app_context():
+        news_app.save_all_json_files()
+    news_app.page_cache.clear()
+    seed_seconds = round(time.perf_counter() - started, 1)
+    print(f"  готово за {seed_seconds} с")
+
+    print_section(f"SUITE: {args.articles} статей")
+    ctx = SuiteContext(args.articles)
+    selected = set(args.routes or [])
+    routes = {}
+    for name, expected_status, prepare in suite_routes(ctx):
+        if selected and name not in selected:
+            continue
+        stats = measure_route(prepare, expected_status, args.requests, args.max_seconds, args.warmup)
+        routes[name] = stats
+        flag = '' if not stats['unexpected'] else f'   ОЖИДАЛСЯ {expected_status}'
+        print(f"  {name:<42} {stats['throughput_rps']:>9} rps   p50 {stats['p50_ms']:>9} ms   "
+              f"p95 {stats['p95_ms']:>9} ms   p99 {stats['p99_ms']:>9} ms{flag}")
+    return {'articles': args.articles, 'seed_seconds': seed_seconds, 'routes': routes}
+
+
+def suite_metadata():
+    """Окружение прогона: сравнивать с baseline имеет смысл только на той же машине"""
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare_with_baseline(results, baseline, threshold, min_delta_ms):
+    """Сценарии, у которых p95 вырос больше чем на threshold (доля) и на min_delta_ms"""
+    regressions = []
+    for size, current in results['sizes'].items():
+        base_routes = baseline.get('sizes', {}).get(size, {}).get('routes', {})
+        for name, stats in current['routes'].items():
+            base = base_routes.get(name)
+            if not base:
+                continue
+            delta = stats['p95_ms'] - base['p95_ms']
+            if stats['p95_ms'] > base['p95_ms'] * (1 + threshold) and delta > min_delta_ms:
+                regressions.append({
+                    'size': size, 'route': name,
+                    'baseline_p95_ms': base['p95_ms'], 'p95_ms': stats['p95_ms'],
+                    'ratio': round(stats['p95_ms'] / base['p95_ms'], 2) if base['p95_ms'] else None
+                })
+    return regressions
+
+
+def run_child(arguments, **env_overrides):
+    """Подкоманда benchmark.py в отдельном процессе со своей временной базой; возвращает её результаты"""
+    env = {key: value for key, value in INHERITED_ENV.items()
+           if key not in ('DATABASE_URL', 'ARTICLES_JSON', 'COMMENTS_JSON')}
+    env.update(env_overrides)
+    fd, output = tempfile.mkstemp(suffix='.json', dir=TMP_DIR)
+    os.close(fd)
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--output', output, *arguments], env=env, check=True)
+    with open(output, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def bench_suite(args):
+    """Сценарии по всем маршрутам для каждого размера базы.
+
+    Каждый размер прогоняется в отдельном процессе со своей временной базой и JSON файлами.
+    """
+    results = {'meta': suite_metadata(), 'sizes': {}}
+    for size in args.sizes:
+        arguments = ['suite-size', '--articles', str(size), '--requests', str(args.requests),
+                     '--max-seconds', str(args.max_seconds), '--warmup', str(args.warmup)]
+        if args.routes:
+            arguments += ['--routes', *args.routes]
+        results['sizes'][str(size)] = run_child(arguments)
+
+    results['failed'] = [
+        f"{size}: {name} {stats['statuses']}"
+        for size, result in results['sizes'].items()
+        for name, stats in result['routes'].items() if stats['unexpected']
+    ]
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        results['regressions'] = compare_with_baseline(results, baseline, args.threshold, args.min_delta_ms)
+        print_section(f"СРАВНЕНИЕ С {args.baseline} (порог +{args.threshold:.0%}, p95)")
+        for item in results['regressions']:
+            print(f"  {item['size']:>8}  {item['route']:<42} {item['baseline_p95_ms']:>9} -> {item['p95_ms']} ms")
+        if not results['regressions']:
+            print("  замедлений нет")
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nBaseline сохранён в {args.save_baseline}")
+    # Код выхода по failed и regressions выставляет main() после записи --output
+    return results
+
+
+def run_sqlite_profile(args):
+    """Одновременные чтение и запись комментариев на базе с текущим профилем SQLite"""
+    seed_articles(args.articles)
+    seed_comments(args.articles)
+    with app.app_context():
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        token = news_app.create_access_token(User.query.filter_by(email='test@example.com').first())
+    print_section(f"SQLITE: профиль {app.config['SQLITE_PROFILE']} (journal_mode={journal_mode})")
+
+    headers = {'Authorization': f'Bearer {token}'}
+    rng = random.Random(1)
+    with LocalServer() as server:
+        summary = run_load([
+            ('POST /api/comment', args.write_threads,
+             lambda: server.request('POST', '/api/comment', {
+                 'article_id': rng.randint(1, args.articles), 'text': 'Комментарий под нагрузкой'
+             }, headers)[0]),
+            ('GET /api/articles?limit=20', args.read_threads,
+             lambda: server.request('GET', '/api/articles?limit=20')[0]),
+            ('GET /api/articles/<id>', args.read_threads,
+             lambda: server.request('GET', f'/api/articles/{rng.randint(1, args.articles)}')[0]),
+        ], args.duration)
+    print_summary(summary)
+    return {'profile': app.config['SQLITE_PROFILE'], 'journal_mode': journal_mode, 'scenarios': summary}
+
+
+def bench_sqlite(args):
+    """Профиль production против настроек SQLite по умолчанию под одновременной записью и чтением"""
+    results = {}
+    for profile in ('default', 'production'):
+        results[profile] = run_child([
+            'sqlite-profile', '--articles', str(args.articles), '--duration', str(args.duration),
+            '--read-threads', str(args.read_threads), '--write-threads', str(args.write_threads)
+        ], SQLITE_PROFILE=profile)
+
+    print_section("SQLITE: default -> production (rps, p95 мс)")
+    for name, stats in results['production']['scenarios'].items():
+        before = results['default']['scenarios'][name]
+        ratio = stats['throughput_rps'] / before['throughput_rps'] if before['throughput_rps'] else 0
+        print(f"  {name:<28} {before['throughput_rps']:>8} -> {stats['throughput_rps']:<8} rps (x{ratio:.2f})   "
+              f"p95 {before['p95_ms']} -> {stats['p95_ms']} мс")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки новостного блога')
+    parser.add_argument('--output', help='Сохранить результаты в JSON файл')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    login = subparsers.add_parser('login', help='Логины под нагрузкой вместе с чтением статей')
+    login.add_argument('--duration', type=float, default=5)
+    login.add_argument('--articles', type=int, default=1000)
+    login.add_argument('--login-threads', type=int, default=8)
+    login.add_argument('--read-threads', type=int, default=4)
+    login.add_argument('--hash-workers', type=int, default=2)
+    login.add_argument('--max-pending', type=int, default=4)
+    login.set_defaults(func=bench_login)
+
+    search = subparsers.add_parser('search', help='Полнотекстовый поиск FTS5 против LIKE')
+    search.add_argument('--articles', type=int, default=100000)
+    search.add_argument('--repeat', type=int, default=20)
+    search.set_defaults(func=bench_search)
+
+    def add_suite_arguments(command):
+        command.add_argument('--requests', type=int, default=50, help='Замеров на сценарий')
+        command.add_argument('--max-seconds', type=float, default=5, help='Предел времени на сценарий')
+        command.add_argument('--warmup', type=int, default=1, help='Незамеряемых запросов перед замерами')
+        command.add_argument('--routes', nargs='+', help='Только перечисленные сценарии (по имени)')
+
+    suite = subparsers.add_parser('suite', help='Все маршруты на базах разного размера, сравнение с baseline')
+    suite.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000],
+                       help='Размеры базы в статьях, например 1000 100000 1000000')
+    suite.add_argument('--baseline', help='JSON с прошлыми результатами для сравнения')
+    suite.add_argument('--save-baseline', help='Сохранить результаты как baseline')
+    suite.add_argument('--threshold', type=float, default=0.3, help='Допустимый рост p95 (доля)')
+    suite.add_argument('--min-delta-ms', type=float, default=2, help='Игнорировать рост p95 меньше, мс')
+    add_suite_arguments(suite)
+    suite.set_defaults(func=bench_suite)
+
+    suite_size = subparsers.add_parser('suite-size', help='Сценарии suite для одного размера базы')
+    suite_size.add_argument('--articles', type=int, default=1000)
+    suite_size.add_argument('--comments', type=int, help='По умолчанию четверть от числа статей, не меньше 1000')
+    add_suite_arguments(suite_size)
+    suite_size.set_defaults(func=run_suite_size)
+
+    def add_sqlite_arguments(command):
+        command.add_argument('--articles', type=int, default=10000)
+        command.add_argument('--duration', type=float, default=10)
+        command.add_argument('--read-threads', type=int, default=4, help='Потоков на каждый сценарий чтения')
+        command.add_argument('--write-threads', type=int, default=4)
+
+    sqlite = subparsers.add_parser('sqlite', help='Профиль SQLite production против настроек по умолчанию')
+    add_sqlite_arguments(sqlite)
+    sqlite.set_defaults(func=bench_sqlite)
+
+    sqlite_profile = subparsers.add_parser('sqlite-profile', help='Нагрузка чтения и записи для SQLITE_PROFILE')
+    add_sqlite_arguments(sqlite_profile)
+    sqlite_profile.set_defaults(func=run_sqlite_profile)
+
+    args = parser.parse_args()
+    results = args.func(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    # Неожиданные статусы и замедления относительно baseline - ненулевой код выхода
+    if results.get('failed') or results.get('regressions'):
+        for failure in results.get('failed', []):
+            print(f"  неожиданный статус: {failure}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
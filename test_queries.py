@@ -0,0 +1,992 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Тесты работают на отдельной временной базе и отдельных JSON файлах
+_tmp_dir = tempfile.mkdtemp(prefix='news_blog_test_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'news_blog.db')
+os.environ['ARTICLES_JSON'] = os.path.join(_tmp_dir, 'articles.json')
+os.environ['COMMENTS_JSON'] = os.path.join(_tmp_dir, 'comments.json')
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import (app, db, cache_sync, create_access_token, create_refresh_token, data_version, find_refresh_token,
+                 flush_json_snapshots, fts_query, hash_refresh_token, json_file_cache, latest_feed, load_json_data,
+                 page_cache, password_hasher, purge_refresh_tokens, save_all_json_files, save_json_changes,
+                 save_json_data, PasswordHasherBusy, User, Article, Comment, RefreshToken, ARTICLES_JSON, COMMENTS_JSON)
+
+# Сверка с cache_generation не должна попадать в подсчёт запросов; её тест включает её сам
+app.config['CACHE_SYNC_INTERVAL'] = 3600
+
+
+class QueryCounter:
+    """Подсчёт (и запись текста) SQL запросов, выполненных движком"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, connection, cursor, statement, *args, **kwargs):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, 'before_cursor_execute', self)
+
+
+def seed_articles(count, comments_per_article=3):
+    """Создание статей разных авторов с комментариями"""
+    with app.app_context():
+        Comment.query.delete()
+        Article.query.delete()
+        authors = []
+        for i in range(3):
+            email = f'author{i}@example.com'
+            user = User.query.filter_by(email=email).first()
+            if not user:
+                user = User(name=f'Автор {i}', email=email, hashed_password='-')
+                db.session.add(user)
+            authors.append(user)
+        db.session.flush()
+        for i in range(count):
+            article = Article(
+                title=f'Статья {i}',
+                text='Текст статьи ' * 20,
+                category=['technology', 'science'][i % 2],
+                user_id=authors[i % len(authors)].id,
+                comments_count=comments_per_article
+            )
+            db.session.add(article)
+            db.session.flush()
+            for j in range(comments_per_article):
+                db.session.add(Comment(text=f'Комментарий {j}', author_name='Читатель', article_id=article.id))
+        db.session.commit()
+    # Данные изменены в обход эндпоинтов - сбрасываем кэш страниц и пересобираем ленту вручную
+    page_cache.clear()
+    with app.app_context():
+        latest_feed.rebuild()
+
+
+def count_queries(url, headers=None, status=200):
+    """Количество SQL запросов, потребовавшихся для ответа на GET запрос"""
+    client = app.test_client()
+    with app.app_context():
+        with QueryCounter() as counter:
+            response = client.get(url, headers=headers)
+    assert response.status_code == status
+    return counter.count
+
+
+def auth_headers(email):
+    """Заголовок Authorization с access токеном пользователя"""
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(User.query.filter_by(email=email).first())}'}
+
+
+@pytest.mark.parametrize('url', [
+    '/api/articles',
+    '/api/articles?limit=5',
+    '/api/articles/category/science',
+    '/api/articles/sort/date',
+    '/api/debug/articles',
+    '/',
+    '/articles',
+    '/articles/science',
+])
+def test_article_lists_use_constant_number_of_queries(url):
+    """Число запросов для списка статей не зависит от количества статей"""
+    seed_articles(5)
+    small = count_queries(url)
+    seed_articles(20)
+    large = count_queries(url)
+    assert small == large
+    assert large <= 2
+
+
+@pytest.mark.parametrize('debug', [False, True])
+@pytest.mark.parametrize('url', [
+    '/api/articles',
+    '/api/articles/category/science',
+    '/api/articles/category/culture',  # пустой список
+    '/api/articles/sort/date',
+    '/api/comment',
+])
+def test_streamed_list_matches_jsonify(url, debug, monkeypatch):
+    """?stream=1 отдаёт те же байты, что и обычный ответ (с отступами в режиме отладки)"""
+    monkeypatch.setitem(app.config, 'API_STREAM_BATCH_SIZE', 7)
+    seed_articles(30)
+    monkeypatch.setattr(app, 'debug', debug)
+    client = app.test_client()
+    expected = client.get(url)
+    streamed = client.get(url, query_string={'stream': 1})
+    assert streamed.status_code == 200
+    assert streamed.is_streamed
+    assert streamed.data == expected.data
+
+
+@pytest.mark.parametrize('url', [
+    '/api/articles?fields=id,title',
+    '/api/articles/category/science?fields=id,title,comments_count&limit=2',
+    '/api/articles/sort/date?fields=id,title&limit=2',
+    '/api/articles/{id}?fields=id,title',
+])
+def test_article_fields_select_only_requested_columns(url, monkeypatch):
+    """?fields= не читает из БД незапрошенные колонки (в том числе text) и не делает JOIN с автором"""
+    monkeypatch.setitem(app.config, 'LATEST_FEED_ENABLED', False)
+    seed_articles(3)
+    with app.app_context():
+        url = url.format(id=Article.query.first().id)
+    client = app.test_client()
+    with app.app_context():
+        with QueryCounter() as counter:
+            response = client.get(url)
+    assert response.status_code == 200
+    statements = [statement for statement in counter.statements if 'FROM article' in statement]
+    assert statements
+    for statement in statements:
+        assert 'article.text' not in statement
+        assert 'article.excerpt' not in statement
+        assert 'JOIN' not in statement
+
+
+@pytest.mark.parametrize('url', ['/api/articles?fields=id,password', '/api/articles/1?fields=title,secret'])
+def test_unknown_article_fields_are_rejected(url):
+    response = app.test_client().get(url)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Неизвестные поля')
+
+
+def test_recount_comments_restores_counters():
+    """recount-comments приводит счётчики всех статей к числу их комментариев"""
+    seed_articles(3, comments_per_article=2)
+    with app.app_context():
+        emptied_id = Article.query.first().id
+        Comment.query.filter_by(article_id=emptied_id).delete()
+        Article.query.update({Article.comments_count: 99})
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['recount-comments'])
+    assert result.exit_code == 0
+    with app.app_context():
+        counts = {article.id: article.comments_count for article in Article.query}
+    assert counts.pop(emptied_id) == 0
+    assert list(counts.values()) == [2, 2]
+
+
+def test_excerpt_follows_article_text():
+    """excerpt заполняется при создании, пересчитывается при правке и восстанавливается backfill-excerpts"""
+    seed_articles(1)
+    long_text = 'Ж' * 150 + 'ё' * 150
+    with app.app_context():
+        article = Article(title='Длинная', text=long_text, category='general',
+                          user_id=User.query.filter_by(email='author0@example.com').first().id)
+        db.session.add(article)
+        db.session.commit()
+        article_id = article.id
+        assert article.excerpt == long_text[:201]
+
+    client = app.test_client()
+    client.put(f'/api/articles/{article_id}', headers=auth_headers('author0@example.com'), json={'content': 'Коротко'})
+    with app.app_context():
+        assert db.session.get(Article, article_id).excerpt == 'Коротко'
+
+    set_password('author0@example.com', 'секрет', app.config['PASSWORD_HASH_METHOD'])
+    client.post('/login', data={'email': 'author0@example.com', 'password': 'секрет'})
+    client.post(f'/edit-article/{article_id}', data={'title': 'Длинная', 'text': long_text, 'category': 'general'})
+    with app.app_context():
+        assert db.session.get(Article, article_id).excerpt == long_text[:201]
+        Article.query.update({Article.excerpt: ''})
+        db.session.commit()
+    assert app.test_cli_runner().invoke(args=['backfill-excerpts']).exit_code == 0
+    with app.app_context():
+        assert {article.id: article.excerpt for article in Article.query} == \
+            {article.id: article.text[:201] for article in Article.query}
+
+
+def test_article_detail_does_not_load_comments():
+    seed_articles(1, comments_per_article=10)
+    with app.app_context():
+        article_id = Article.query.first().id
+    assert count_queries(f'/api/articles/{article_id}') == 1
+    response = app.test_client().get(f'/api/articles/{article_id}')
+    assert response.get_json()['comments_count'] == 10
+
+
+def test_news_detail_loads_one_page_of_comments(monkeypatch):
+    """Страница статьи читает одну страницу комментариев независимо от их общего числа"""
+    monkeypatch.setitem(app.config, 'COMMENTS_PAGE_SIZE', 5)
+    seed_articles(1, comments_per_article=3)
+    with app.app_context():
+        article_id = Article.query.first().id
+    small = count_queries(f'/news/{article_id}')
+    seed_articles(1, comments_per_article=40)
+    with app.app_context():
+        article_id = Article.query.first().id
+    assert count_queries(f'/news/{article_id}') == small
+    page = app.test_client().get(f'/news/{article_id}').get_data(as_text=True)
+    assert page.count('class="comment-item') == 5 + 1  # страница и шаблон для "Показать ещё"
+    assert 'id="load-more-comments"' in page
+
+
+def test_article_comments_api_pages_through_all_comments():
+    seed_articles(2, comments_per_article=7)
+    with app.app_context():
+        article_id = Article.query.first().id
+        expected = [comment.id for comment in Comment.query.filter_by(article_id=article_id)
+                    .order_by(Comment.date.desc(), Comment.id.desc())]
+    client = app.test_client()
+    ids, cursor = [], None
+    while True:
+        query = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+        page = client.get(f'/api/articles/{article_id}/comments', query_string=query).get_json()
+        ids += [comment['id'] for comment in page['items']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert ids == expected
+    assert client.get(f'/api/articles/{article_id}/comments').get_json() == \
+        client.get(f'/api/articles/{article_id}/comments?limit=100').get_json()['items']
+    assert client.get('/api/articles/999999/comments').status_code == 404
+
+
+@pytest.mark.parametrize('same_dates', [False, True])
+@pytest.mark.parametrize('url', ['/api/articles', '/api/articles/category/science', '/api/comment'])
+def test_cursor_pages_cover_the_whole_list(url, same_dates):
+    """Страницы ?limit=&cursor= дают весь список без пропусков и повторов, в том числе при равных датах"""
+    seed_articles(7, comments_per_article=2)
+    if same_dates:
+        with app.app_context():
+            Article.query.update({Article.created_date: datetime(2024, 1, 1)})
+            Comment.query.update({Comment.date: datetime(2024, 1, 1)})
+            db.session.commit()
+            latest_feed.rebuild()
+    client = app.test_client()
+    expected = client.get(url).get_json()
+    items, cursors = [], [None]
+    while True:
+        page = client.get(url, query_string={'limit': 2, 'cursor': cursors[-1]}).get_json()
+        items += page['items']
+        if not page['next_cursor']:
+            break
+        cursors.append(page['next_cursor'])
+    assert items == expected
+    assert len(expected) == {'/api/articles': 7, '/api/articles/category/science': 3, '/api/comment': 14}[url]
+    assert client.get(url, query_string={'limit': 3, 'cursor': 'не-курсор'}).status_code == 400
+    # cursor без limit
+    assert client.get(url, query_string={'cursor': cursors[1]}).status_code == 400
+
+
+@pytest.mark.parametrize('url', ['/api/articles', '/api/articles/category/science', '/api/comment?limit=5'])
+def test_conditional_get_answers_304_without_queries(url):
+    """Совпавший If-None-Match или If-Modified-Since - 304 без SQL; запись меняет ETag"""
+    seed_articles(3)
+    client = app.test_client()
+    response = client.get(url)
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+    assert count_queries(url, headers={'If-None-Match': etag}, status=304) == 0
+    assert count_queries(url, headers={'If-Modified-Since': last_modified}, status=304) == 0
+
+    with app.app_context():
+        article_id = Article.query.first().id
+    client.post('/api/comment', headers=auth_headers('author0@example.com'),
+                json={'text': 'Новый', 'article_id': article_id})
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_write_in_same_second_is_not_answered_with_304():
+    """Запись в ту же секунду, что и прошлый ответ, сдвигает Last-Modified"""
+    seed_articles(1)
+    client = app.test_client()
+    headers = auth_headers('author0@example.com')
+    with app.app_context():
+        article_id = Article.query.first().id
+    client.post('/api/comment', headers=headers, json={'text': 'Первый', 'article_id': article_id})
+    last_modified = client.get('/api/articles').headers['Last-Modified']
+    client.post('/api/comment', headers=headers, json={'text': 'Второй', 'article_id': article_id})
+    response = client.get('/api/articles', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+    assert response.headers['Last-Modified'] != last_modified
+
+
+def test_article_detail_etag_follows_its_comments():
+    seed_articles(2)
+    client = app.test_client()
+    with app.app_context():
+        article_id = Article.query.first().id
+    etag = client.get(f'/api/articles/{article_id}').headers['ETag']
+    assert count_queries(f'/api/articles/{article_id}', headers={'If-None-Match': etag}, status=304) == 0
+
+    client.post('/api/comment', headers=auth_headers('author0@example.com'), json={'text': 'Новый', 'article_id': article_id})
+    response = client.get(f'/api/articles/{article_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['comments_count'] == 4
+
+
+def test_etag_is_the_same_in_every_worker():
+    """Другой процесс с той же базой отдаёт для тех же данных те же ETag и Last-Modified"""
+    seed_articles(2)
+    client = app.test_client()
+    with app.app_context():
+        article_id = Article.query.first().id
+    client.post('/api/comment', headers=auth_headers('author0@example.com'), json={'text': 'Новый', 'article_id': article_id})
+    urls = ['/api/articles', f'/api/articles/{article_id}']
+    here = [[response.headers['ETag'], response.headers['Last-Modified']] for response in map(client.get, urls)]
+
+    script = ('import json, sys\n'
+              'from app import app\n'
+              'responses = [app.test_client().get(url) for url in sys.argv[1:]]\n'
+              'print(json.dumps([[r.headers["ETag"], r.headers["Last-Modified"]] for r in responses]))')
+    worker = subprocess.run([sys.executable, '-c', script, *urls], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert json.loads(worker.stdout.splitlines()[-1]) == here
+
+
+def test_page_cache_is_invalidated_by_writes():
+    """Страница гостя берётся из кэша до записи статьи или комментария"""
+    seed_articles(2)
+    client = app.test_client()
+    headers = auth_headers('author0@example.com')
+    client.get('/articles')
+    assert count_queries('/articles') == 0
+
+    created = client.post('/api/articles', headers=headers, json={'title': 'Свежая статья', 'content': 'Текст'})
+    assert 'Свежая статья' in client.get('/articles').get_data(as_text=True)
+    assert count_queries('/articles') == 0
+
+    client.post('/api/comment', headers=headers, json={'text': 'Новый', 'article_id': created.get_json()['id']})
+    assert count_queries('/articles') > 0
+
+
+def test_page_rendered_before_invalidation_is_not_cached():
+    """Страница, отрисованная до очистки кэша (параллельной записью), в кэш не попадает"""
+    from flask import template_rendered
+
+    seed_articles(2)
+    client = app.test_client()
+
+    def write_during_render(sender, template, context, **extra):
+        page_cache.clear()
+
+    template_rendered.connect(write_during_render, app)
+    try:
+        client.get('/articles')
+    finally:
+        template_rendered.disconnect(write_during_render, app)
+    assert page_cache.stats()['entries'] == 0
+    client.get('/articles')
+    assert page_cache.stats()['entries'] == 1
+
+
+def test_page_cache_skips_logged_in_users():
+    seed_articles(2)
+    client = app.test_client()
+    with app.app_context():
+        user_id = User.query.filter_by(email='author0@example.com').first().id
+    with client.session_transaction() as web_session:
+        web_session['_user_id'] = str(user_id)
+    page = client.get('/articles').get_data(as_text=True)
+    assert 'Выйти (Автор 0)' in page
+    assert page_cache.stats()['entries'] == 0
+    assert 'Выйти' not in app.test_client().get('/articles').get_data(as_text=True)
+
+
+def test_fts_query_quotes_words_and_adds_prefixes():
+    assert fts_query('квант "физика* OR x') == '"квант"* "физика"* "OR"* "x"'
+    assert fts_query('NEAR( * -') == '"NEAR"*'
+    assert fts_query(' "*-: ') == ''
+
+
+def search_ids(client, q, **params):
+    response = client.get('/api/search', query_string={'q': q, **params})
+    assert response.status_code == 200
+    return [item['id'] for item in response.get_json()['items']]
+
+
+def test_search_index_follows_inserts_updates_and_deletes():
+    """Триггеры FTS5 синхронизируют индекс со вставкой, изменением и (каскадным) удалением"""
+    if not app.config['SEARCH_ENABLED']:
+        pytest.skip('SQLite без FTS5')
+    seed_articles(3)
+    client = app.test_client()
+    headers = auth_headers('author0@example.com')
+
+    article_id = client.post('/api/articles', headers=headers, json={
+        'title': 'Наблюдение квазара', 'content': 'Телескоп увидел далёкий квазар', 'category': 'science'
+    }).get_json()['id']
+    comment_id = client.post('/api/comment', headers=headers, json={
+        'text': 'Отличный метеорит', 'article_id': article_id
+    }).get_json()['id']
+    assert search_ids(client, 'кваз') == [article_id]
+    assert search_ids(client, 'квазар', category='science') == [article_id]
+    assert search_ids(client, 'квазар', category='sports') == []
+    assert search_ids(client, 'метеор', type='comment') == [comment_id]
+    assert search_ids(client, 'метеор', type='comment', category='science') == [comment_id]
+
+    client.put(f'/api/articles/{article_id}', headers=headers, json={'title': 'Пульсар', 'content': 'Пульсар'})
+    assert search_ids(client, 'квазар') == []
+    assert search_ids(client, 'пульсар') == [article_id]
+
+    client.delete(f'/api/articles/{article_id}', headers=headers)
+    assert search_ids(client, 'пульсар') == []
+    assert search_ids(client, 'метеор', type='comment') == []
+
+
+def test_search_snippet_escapes_html():
+    """В snippet экранирован весь текст, размечены только совпадения"""
+    if not app.config['SEARCH_ENABLED']:
+        pytest.skip('SQLite без FTS5')
+    seed_articles(1)
+    client = app.test_client()
+    client.post('/api/articles', headers=auth_headers('author0@example.com'), json={
+        'title': 'Уязвимость', 'content': 'Картинка <img src=x onerror=alert(1)> внутри'
+    })
+    item = client.get('/api/search', query_string={'q': 'картинка'}).get_json()['items'][0]
+    assert '<img' not in item['snippet']
+    assert item['snippet'].startswith('<mark>Картинка</mark> &lt;img src=x onerror=alert(1)&gt;')
+
+
+def test_search_validates_parameters_and_pages():
+    if not app.config['SEARCH_ENABLED']:
+        pytest.skip('SQLite без FTS5')
+    seed_articles(5)
+    client = app.test_client()
+    for params in ({'q': ''}, {'q': '"*'}, {'q': 'статья', 'type': 'user'}, {'q': 'статья', 'category': 'bogus'},
+                   {'q': 'статья', 'page': 0}, {'q': 'статья', 'limit': 'x'}):
+        assert client.get('/api/search', query_string=params).status_code == 400, params
+    first = client.get('/api/search', query_string={'q': 'статья', 'limit': 3}).get_json()
+    second = client.get('/api/search', query_string={'q': 'статья', 'limit': 3, 'page': 2}).get_json()
+    assert (first['next_page'], second['next_page']) == (2, None)
+    assert len({item['id'] for item in first['items'] + second['items']}) == 5
+
+
+def test_refresh_tokens_are_stored_hashed_revoked_and_purged():
+    """В базе только SHA-256 токена; токен действует до отзыва, очистка удаляет истёкшие и отозванные"""
+    seed_articles(0)
+    client = app.test_client()
+    with app.app_context():
+        user_id = User.query.filter_by(email='author0@example.com').first().id
+        token = create_refresh_token(user_id)
+        valid = create_refresh_token(user_id)
+        stored = find_refresh_token(token)
+        assert stored.token_hash == hash_refresh_token(token)
+        row = db.session.execute(db.text('SELECT * FROM refresh_token WHERE id = :id'), {'id': stored.id}).one()
+        assert not any(token in str(value) for value in row)
+
+    for _ in range(2):
+        response = client.post('/api/auth/refresh', json={'refresh_token': token})
+        assert response.status_code == 200
+        assert 'access_token' in response.get_json()
+    headers = auth_headers('author0@example.com')
+    assert client.post('/api/auth/logout', headers=headers, json={'refresh_token': token}).status_code == 200
+    assert client.post('/api/auth/refresh', json={'refresh_token': token}).status_code == 401
+
+    with app.app_context():
+        db.session.add(RefreshToken(token_hash='0' * 64, user_id=user_id,
+                                    expires_at=datetime.utcnow() - timedelta(days=1)))
+        db.session.commit()
+        assert purge_refresh_tokens(batch_size=1) >= 2
+        assert find_refresh_token(token) is None
+        assert RefreshToken.query.filter_by(token_hash='0' * 64).first() is None
+        assert find_refresh_token(valid) is not None
+        assert all(not t.revoked and t.expires_at > datetime.utcnow() for t in RefreshToken.query)
+
+
+def set_password(email, password, method):
+    """Пароль пользователя, захэшированный с заданными параметрами"""
+    with app.app_context():
+        user = User.query.filter_by(email=email).first()
+        user.hashed_password = generate_password_hash(password, method=method)
+        db.session.commit()
+        return user.hashed_password
+
+
+def test_login_upgrades_old_hash_and_keeps_it_when_pool_is_full(monkeypatch):
+    """Пересчёт устаревшего хэша необязателен: при полной очереди вход проходит со старым хэшем"""
+    seed_articles(0)
+    client = app.test_client()
+    credentials = {'email': 'author1@example.com', 'password': 'секрет'}
+    old_hash = set_password(credentials['email'], credentials['password'], 'pbkdf2:sha256:1000')
+
+    def busy(password):
+        raise PasswordHasherBusy()
+
+    with monkeypatch.context() as patch:
+        patch.setattr('app.hash_password', busy)
+        assert client.post('/api/auth/login', json=credentials).status_code == 200
+    with app.app_context():
+        assert User.query.filter_by(email=credentials['email']).first().hashed_password == old_hash
+
+    assert client.post('/api/auth/login', json=credentials).status_code == 200
+    with app.app_context():
+        new_hash = User.query.filter_by(email=credentials['email']).first().hashed_password
+    assert new_hash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+
+
+def test_login_is_shed_with_503_when_hash_queue_is_full():
+    seed_articles(0)
+    client = app.test_client()
+    credentials = {'email': 'author2@example.com', 'password': 'секрет'}
+    set_password(credentials['email'], credentials['password'], app.config['PASSWORD_HASH_METHOD'])
+    password_hasher.start()
+    for _ in range(app.config['PASSWORD_HASH_MAX_PENDING']):
+        assert password_hasher.slots.acquire(blocking=False)
+    try:
+        response = client.post('/api/auth/login', json=credentials)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        for _ in range(app.config['PASSWORD_HASH_MAX_PENDING']):
+            password_hasher.slots.release()
+    assert client.post('/api/auth/login', json=credentials).status_code == 200
+
+
+def test_stateless_jwt_skips_user_queries_until_user_is_deleted(monkeypatch):
+    """Stateless токен не требует запросов к БД; удаление пользователя сбрасывает кэш его существования"""
+    monkeypatch.setitem(app.config, 'JWT_STATELESS', True)
+    with app.app_context():
+        user = User(name='Без состояния', email='stateless@example.com', hashed_password='-')
+        db.session.add(user)
+        db.session.commit()
+    headers = auth_headers('stateless@example.com')
+    assert count_queries('/api/auth/me', headers) == 0
+
+    monkeypatch.setitem(app.config, 'JWT_USER_CHECK_TTL', 60)
+    assert count_queries('/api/auth/me', headers) == 1
+    assert count_queries('/api/auth/me', headers) == 0
+    with app.app_context():
+        db.session.delete(User.query.filter_by(email='stateless@example.com').first())
+        db.session.commit()
+    assert count_queries('/api/auth/me', headers, status=401) == 1
+
+
+def test_comment_edits_change_article_comments_etag():
+    """Изменение комментария (PUT и массовое) меняет ETag списка комментариев его статьи"""
+    seed_articles(1, comments_per_article=2)
+    client = app.test_client()
+    with app.app_context():
+        comment = Comment.query.first()
+        comment_id, article_id = comment.id, comment.article_id
+    headers = auth_headers('test@example.com')
+    url = f'/api/articles/{article_id}/comments'
+
+    for update in (
+        lambda: client.put(f'/api/comment/{comment_id}', json={'text': 'Исправлено'}),
+        lambda: client.post('/api/comment/bulk', json=[{'id': comment_id, 'text': 'Исправлено ещё раз'}],
+                            headers=headers),
+    ):
+        etag = client.get(url).headers['ETag']
+        assert update().status_code == 200
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        text = next(item['text'] for item in response.get_json() if item['id'] == comment_id)
+        assert text.startswith('Исправлено')
+
+
+def test_bulk_articles_report_errors_per_item():
+    """Неверные элементы пачки получают свою ошибку, корректные записываются"""
+    seed_articles(3)
+    client = app.test_client()
+    with app.app_context():
+        own_id = Article.query.filter(Article.author.has(email='author0@example.com')).first().id
+        foreign_id = Article.query.filter(Article.author.has(email='author1@example.com')).first().id
+    response = client.post('/api/articles/bulk', headers=auth_headers('author0@example.com'), json=[
+        {'title': 'Новая', 'content': 'Текст', 'category': 'science'},
+        {'title': ['x'], 'content': 'Текст'},
+        {'title': 'Новая', 'content': 'Текст', 'category': 'bogus'},
+        {'id': own_id, 'title': None},
+        {'id': own_id, 'title': 'Обновлена'},
+        {'id': foreign_id, 'title': 'Чужая'},
+        {'id': 999999, 'title': 'Нет такой'},
+        'не объект',
+        {'id': True, 'title': 'Булево'},
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['succeeded'], body['failed']) == (2, 7)
+    assert ['id' in item for item in body['items']] == [True, False, False, False, True, False, False, False, False]
+    assert body['items'][8]['error'] == 'Статья не найдена'
+    assert body['items'][5]['error'] == 'Недостаточно прав для редактирования статьи'
+    with app.app_context():
+        assert db.session.get(Article, own_id).title == 'Обновлена'
+        assert db.session.get(Article, foreign_id).title != 'Чужая'
+        assert db.session.get(Article, body['items'][0]['id']).category == 'science'
+
+
+def test_bulk_comments_report_errors_per_item(monkeypatch):
+    seed_articles(1, comments_per_article=1)
+    client = app.test_client()
+    with app.app_context():
+        comment = Comment.query.first()
+        comment_id, article_id = comment.id, comment.article_id
+    response = client.post('/api/comment/bulk', headers=auth_headers('author0@example.com'), json=[
+        {'text': 'Новый', 'article_id': article_id},
+        {'text': {'a': 1}, 'article_id': article_id},
+        {'text': 'Новый', 'article_id': 999999},
+        {'id': comment_id, 'text': 'Исправлен', 'author_name': None},
+        {'id': comment_id, 'text': 'Исправлен'},
+        {'id': True, 'text': 'Булево'},
+        {'text': 'Булево', 'article_id': True},
+    ])
+    body = response.get_json()
+    assert ['id' in item for item in body['items']] == [True, False, False, False, True, False, False]
+    monkeypatch.setitem(app.config, 'API_BULK_MAX_ITEMS', 2)
+    too_many = client.post('/api/comment/bulk', headers=auth_headers('author0@example.com'),
+                           json=[{'text': 'x', 'article_id': article_id}] * 3)
+    assert too_many.status_code == 413
+    with app.app_context():
+        assert Comment.query.filter_by(article_id=article_id).count() == 2
+        assert db.session.get(Article, article_id).comments_count == 2
+
+
+def test_latest_feed_serves_first_pages_and_follows_writes(monkeypatch):
+    """Главная и первые страницы списков берутся из ленты в памяти и совпадают с чтением из БД"""
+    monkeypatch.setitem(app.config, 'LATEST_FEED_SIZE', 5)
+    seed_articles(12)
+    client = app.test_client()
+    urls = ['/api/articles/sort/date?limit=3', '/api/articles/sort/date?limit=5&fields=id,title',
+            '/api/articles/sort/date?limit=8', '/api/articles/category/science?limit=4',
+            '/api/articles/category/culture?limit=2', '/api/articles?limit=2&text_alias=0']
+
+    def assert_matches_database():
+        served = [client.get(url).get_json() for url in urls]
+        monkeypatch.setitem(app.config, 'LATEST_FEED_ENABLED', False)
+        assert served == [client.get(url).get_json() for url in urls]
+        monkeypatch.setitem(app.config, 'LATEST_FEED_ENABLED', True)
+
+    assert count_queries('/api/articles/sort/date?limit=3') == 0
+    assert_matches_database()
+    page = client.get('/').get_data(as_text=True)
+    assert page.count('class="card h-100 news-card"') == 5 and 'Все статьи' in page
+
+    headers = auth_headers('author0@example.com')
+    created = client.post('/api/articles', json={'title': 'Новая', 'content': 'Текст', 'category': 'science'},
+                          headers=headers).get_json()
+    assert_matches_database()
+    client.post('/api/comment', json={'text': 'Комментарий', 'article_id': created['id']}, headers=headers)
+    assert_matches_database()
+    client.put(f"/api/articles/{created['id']}", json={'category': 'culture'}, headers=headers)
+    assert_matches_database()
+    client.delete(f"/api/articles/{created['id']}", headers=headers)
+    assert_matches_database()
+
+
+def test_version_is_published_after_in_memory_views_are_updated(monkeypatch):
+    """Новый ETag появляется, когда лента и кэш страниц уже обновлены"""
+    seed_articles(2)
+    client = app.test_client()
+    client.get('/')
+    seen = []
+    publish = data_version.publish
+
+    def checked_publish():
+        seen.append((latest_feed.page(None, 1)[0][0].title, page_cache.stats()['entries']))
+        publish()
+
+    monkeypatch.setattr(data_version, 'publish', checked_publish)
+    client.post('/api/articles', headers=auth_headers('author0@example.com'), json={'title': 'Свежая', 'content': 'Текст'})
+    assert seen == [('Свежая', 0)]
+
+
+def test_foreign_write_resets_caches_via_cache_generation(monkeypatch):
+    """Запись другого процесса (отдельное соединение с той же базой) сбрасывает кэши и ETag"""
+    seed_articles(3)
+    client = app.test_client()
+    with app.app_context():
+        # Свои записи (наполнение базы) кэши не сбрасывают
+        assert cache_sync.check() == set()
+        article_id = Article.query.order_by(Article.created_date.desc(), Article.id.desc()).first().id
+        database = db.engine.url.database
+    client.get('/')
+    first = client.get('/api/articles?limit=1')
+
+    connection = sqlite3.connect(database)
+    connection.execute("UPDATE article SET title = 'Изменено другим процессом' WHERE id = ?", (article_id,))
+    connection.execute("UPDATE cache_generation SET generation = generation + 1 WHERE name = 'article'")
+    connection.commit()
+    connection.close()
+
+    # До очередной сверки процесс отдаёт данные из своих кэшей
+    assert client.get('/api/articles?limit=1').data == first.data
+    monkeypatch.setitem(app.config, 'CACHE_SYNC_INTERVAL', 0)
+    response = client.get('/api/articles?limit=1', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.get_json()['items'][0]['title'] == 'Изменено другим процессом'
+    assert 'Изменено другим процессом' in client.get('/').get_data(as_text=True)
+
+
+def test_foreign_user_writes_keep_etags_and_cached_pages():
+    """Запись другого процесса только в user сбрасывает лишь кэш пользователей"""
+    seed_articles(2)
+    client = app.test_client()
+    client.get('/')
+    etag = client.get('/api/articles').headers['ETag']
+    with app.app_context():
+        database = db.engine.url.database
+    connection = sqlite3.connect(database)
+    connection.execute("UPDATE cache_generation SET generation = generation + 1 WHERE name = 'user'")
+    connection.commit()
+    connection.close()
+
+    with app.app_context():
+        assert cache_sync.check() == {'user'}
+    assert count_queries('/') == 0
+    assert count_queries('/api/articles', headers={'If-None-Match': etag}, status=304) == 0
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_rate_limit_rejects_with_429_before_database_work(backend, monkeypatch):
+    """Исчерпав бюджет, клиент получает 429 с Retry-After; корзины отдельные по IP и по пользователю JWT"""
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_BACKEND', backend)
+    monkeypatch.setitem(app.config, 'RATE_LIMITS',
+                        dict(app.config['RATE_LIMITS'], api_login=(2, 0.01), api_create_comment=(1, 0.01)))
+    seed_articles(1)
+    client = app.test_client()
+    first_ip, second_ip = {'REMOTE_ADDR': f'10.0.0.1-{backend}'}, {'REMOTE_ADDR': f'10.0.0.2-{backend}'}
+    credentials = {'email': 'test@example.com', 'password': 'wrong'}
+
+    assert [client.post('/api/auth/login', json=credentials, environ_base=first_ip).status_code
+            for _ in range(2)] == [401, 401]
+    with app.app_context():
+        with QueryCounter() as counter:
+            response = client.post('/api/auth/login', json=credentials, environ_base=first_ip)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    # Без БД; с бэкендом 'sqlite' - только списание жетона
+    assert counter.count == (0 if backend == 'memory' else 1)
+    assert client.post('/api/auth/login', json=credentials, environ_base=second_ip).status_code == 401
+
+    with app.app_context():
+        article_id = Article.query.first().id
+    headers = auth_headers('test@example.com')
+    comment = {'text': 'Комментарий', 'article_id': article_id}
+    assert client.post('/api/comment', json=comment, headers=headers, environ_base=first_ip).status_code == 201
+    # Тот же пользователь с другого IP упирается в свою корзину
+    assert client.post('/api/comment', json=comment, headers=headers, environ_base=second_ip).status_code == 429
+
+
+def test_metrics_count_queries_per_endpoint():
+    """/api/debug/metrics учитывает запросы, SQL и размер ответа по эндпоинтам"""
+    seed_articles(5)
+    client = app.test_client()
+    with app.app_context():
+        with QueryCounter() as counter:
+            response = client.get('/api/articles?limit=5')
+    before = client.get('/api/debug/metrics').get_data(as_text=True)
+    client.get('/api/articles?limit=5')
+    metrics = client.get('/api/debug/metrics')
+    assert metrics.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+
+    def sample(text, line_start):
+        lines = [line for line in text.splitlines() if line.startswith(line_start)]
+        return float(lines[0].rsplit(' ', 1)[1]) if lines else 0.0
+
+    text = metrics.get_data(as_text=True)
+    labels = 'endpoint="api_articles_list"'
+    assert sample(text, f'news_blog_sql_statements_total{{{labels}}}') - \
+        sample(before, f'news_blog_sql_statements_total{{{labels}}}') == counter.count
+    assert sample(text, f'news_blog_http_request_duration_seconds_count{{{labels},method="GET"}}') - \
+        sample(before, f'news_blog_http_request_duration_seconds_count{{{labels},method="GET"}}') == 1
+    assert sample(text, f'news_blog_http_response_size_bytes_sum{{{labels},method="GET"}}') - \
+        sample(before, f'news_blog_http_response_size_bytes_sum{{{labels},method="GET"}}') == len(response.data)
+
+
+def json_files():
+    """Содержимое JSON файлов статей и комментариев (порядок записей с одинаковой датой не важен)"""
+    return [sorted(load_json_data(filename), key=lambda item: item['id']) for filename in (ARTICLES_JSON, COMMENTS_JSON)]
+
+
+def test_incremental_json_snapshot_matches_full_rebuild(monkeypatch):
+    """После каждой записи точечно обновлённые JSON файлы совпадают с полной выгрузкой"""
+    monkeypatch.setitem(app.config, 'JSON_SNAPSHOT_ASYNC', False)
+    monkeypatch.setitem(app.config, 'JSON_SNAPSHOT_FULL_REBUILD_EVERY', 1000)
+    seed_articles(3, comments_per_article=2)
+    with app.app_context():
+        save_all_json_files()
+        article_id = Article.query.first().id
+    client = app.test_client()
+    headers = auth_headers('author0@example.com')
+
+    def assert_matches_full_rebuild():
+        incremental = json_files()
+        with app.app_context():
+            save_all_json_files()
+        assert incremental == json_files()
+
+    created = client.post('/api/articles', headers=headers, json={'title': 'Новая', 'content': 'Текст'}).get_json()
+    assert_matches_full_rebuild()
+    comment = client.post('/api/comment', headers=headers, json={'text': 'Новый', 'article_id': created['id']}).get_json()
+    assert_matches_full_rebuild()
+    assert client.put(f'/api/articles/{created["id"]}', headers=headers, json={'title': 'Изменена'}).status_code == 200
+    assert client.put(f'/api/comment/{comment["id"]}', json={'text': 'Исправлен'}).status_code == 200
+    assert_matches_full_rebuild()
+    assert client.delete(f'/api/comment/{comment["id"]}').status_code == 200
+    assert_matches_full_rebuild()
+    # Комментарии удалённой статьи исчезают из снимка вместе с ней
+    assert client.delete(f'/api/articles/{article_id}', headers=headers).status_code == 200
+    articles, comments = json_files()
+    assert article_id not in [item['id'] for item in articles]
+    assert article_id not in [item['article_id'] for item in comments]
+    assert_matches_full_rebuild()
+
+
+def test_json_snapshot_worker_coalesces_changes_until_flush(monkeypatch):
+    """Изменения за окно debounce выгружаются одним вызовом; заголовки показывают свежесть снимка"""
+    monkeypatch.setitem(app.config, 'JSON_SNAPSHOT_DEBOUNCE_SECONDS', 0.3)
+    seed_articles(1)
+    assert flush_json_snapshots(5)
+    with app.app_context():
+        article_id = Article.query.first().id
+    calls = []
+
+    def recording_save(article_ids=(), comment_ids=()):
+        calls.append(set(comment_ids))
+        save_json_changes(article_ids, comment_ids)
+
+    monkeypatch.setattr('app.save_json_changes', recording_save)
+    client = app.test_client()
+    headers = auth_headers('author0@example.com')
+    comment_ids = {client.post('/api/comment', headers=headers, json={'text': f'Новый {i}', 'article_id': article_id})
+                   .get_json()['id'] for i in range(3)}
+
+    response = client.get('/api/json/comments')
+    assert int(response.headers['X-Snapshot-Dirty-Generation']) > int(response.headers['X-Snapshot-Generation'])
+    assert client.get('/api/json/status').get_json()['pending']
+
+    assert flush_json_snapshots(5)
+    assert calls == [comment_ids]
+    response = client.get('/api/json/comments')
+    assert response.headers['X-Snapshot-Dirty-Generation'] == response.headers['X-Snapshot-Generation']
+    assert 'X-Snapshot-Exported-At' in response.headers
+    assert comment_ids <= {item['id'] for item in response.get_json()}
+    assert not client.get('/api/json/status').get_json()['pending']
+
+
+def test_failed_json_export_falls_back_to_full_rebuild(monkeypatch):
+    monkeypatch.setitem(app.config, 'JSON_SNAPSHOT_DEBOUNCE_SECONDS', 0.05)
+    seed_articles(1)
+    assert flush_json_snapshots(5)
+    with app.app_context():
+        article_id = Article.query.first().id
+    rebuilds = []
+
+    def failing_save(article_ids=(), comment_ids=()):
+        raise OSError('Нет места на диске')
+
+    def recording_rebuild():
+        rebuilds.append(True)
+        save_all_json_files()
+
+    monkeypatch.setattr('app.save_json_changes', failing_save)
+    monkeypatch.setattr('app.save_all_json_files', recording_rebuild)
+    client = app.test_client()
+    comment_id = client.post('/api/comment', headers=auth_headers('author0@example.com'),
+                             json={'text': 'Новый', 'article_id': article_id}).get_json()['id']
+    assert flush_json_snapshots(5)
+    assert rebuilds == [True]
+    assert comment_id in [item['id'] for item in load_json_data(COMMENTS_JSON)]
+
+
+def test_json_file_cache_rereads_only_changed_files():
+    """Ответ /api/json/* берётся из кэша, пока файл не изменился"""
+    seed_articles(2)
+    assert flush_json_snapshots(5)
+    with app.app_context():
+        save_all_json_files()
+    client = app.test_client()
+    first = client.get('/api/json/articles').data
+    before = json_file_cache.stats()
+    assert count_queries('/api/json/articles') == 0
+    assert client.get('/api/json/articles').data == first
+    after = json_file_cache.stats()
+    assert (after['hits'] - before['hits'], after['misses'] - before['misses']) == (2, 0)
+
+    save_json_data(ARTICLES_JSON, [{'id': 1, 'title': 'Изменено вручную'}])
+    assert client.get('/api/json/articles').get_json() == [{'id': 1, 'title': 'Изменено вручную'}]
+    assert json_file_cache.stats()['misses'] == after['misses'] + 1
+    with app.app_context():
+        save_all_json_files()
+    assert client.get('/api/json/articles').data == first
+
+
+def call_asgi(application, url, headers=()):
+    """GET запрос к ASGI приложению: (статус, заголовки, тело)"""
+    import asyncio
+
+    path, _, query_string = url.partition('?')
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': query_string.encode(),
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+        'http_version': '1.1', 'scheme': 'http', 'server': ('localhost', 80), 'root_path': '',
+    }
+    result = {'body': b''}
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            result['status'] = message['status']
+            result['headers'] = {name.decode(): value.decode() for name, value in message['headers']}
+        else:
+            result['body'] += message.get('body', b'')
+
+    asyncio.run(application(scope, receive, send))
+    return result['status'], result['headers'], result['body']
+
+
+@pytest.mark.parametrize('url', [
+    '/api/articles',
+    '/api/articles?limit=3',
+    '/api/articles?stream=1',
+    '/api/articles?fields=id,title&limit=3',
+    '/api/articles?limit=0',
+    '/api/articles/category/science?text_alias=0',
+    '/api/articles/category/bogus',
+    '/api/comment?limit=4',
+    '/api/articles/999999/comments',
+    '/api/json/articles',
+    '/api/json/status',
+])
+def test_async_read_path_matches_flask(url):
+    """Асинхронные эндпоинты asgi.py отвечают теми же байтами и ETag, что и Flask"""
+    pytest.importorskip('aiosqlite')
+    pytest.importorskip('a2wsgi')
+    import asgi
+
+    seed_articles(6)
+    expected = app.test_client().get(url)
+    status, headers, body = call_asgi(asgi.application, url)
+    assert status == expected.status_code
+    assert body == expected.data
+    assert headers.get('etag') == expected.headers.get('ETag')
+    if expected.headers.get('ETag'):
+        status, _, body = call_asgi(asgi.application, url, [('If-None-Match', expected.headers['ETag'])])
+        assert (status, body) == (304, b'')
+
+
+def test_async_detail_endpoints_match_flask():
+    pytest.importorskip('aiosqlite')
+    pytest.importorskip('a2wsgi')
+    import asgi
+
+    seed_articles(2)
+    with app.app_context():
+        article_id = Article.query.first().id
+        comment_id = Comment.query.first().id
+    for url in [f'/api/articles/{article_id}', f'/api/articles/{article_id}?fields=title',
+                f'/api/articles/{article_id}/comments?limit=2',
+                '/api/articles/999999', f'/api/comment/{comment_id}', '/api/comment/999999']:
+        expected = app.test_client().get(url)
+        status, _, body = call_asgi(asgi.application, url)
+        assert (status, body) == (expected.status_code, expected.data), url